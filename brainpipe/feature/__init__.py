@@ -1,4 +1,6 @@
-from .basics import (sigfilt, amplitude, power, TF, phase, PLF)  # noqa
-from .coupling.cfc import (pac, PhaseLockedPower, erpac, pfdphase, PLV)  # noqa
+from .basics import (sigfilt, amplitude, power, TF, phase, PLF,  # noqa
+                     spectral_bundle)
+from .coupling.cfc import (pac, PhaseLockedPower, erpac, pfdphase, PLV,  # noqa
+                           cfcsession)
 from .featools import (cfcRndSignals, cfcVec, bandRef, findBandName, findBandFcy)  # noqa
 from .psdfeat import (PSD, powerPSD, SpectralEntropy)  # noqa
\ No newline at end of file
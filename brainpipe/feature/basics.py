@@ -4,16 +4,21 @@ from scipy.stats import wilcoxon, kruskal
 import numpy as np
 
 from joblib import Parallel, delayed
-from itertools import product
 
 from brainpipe.tools import binarize, binArray
 from brainpipe.feature.filtering import fextract, docfilter
+from brainpipe.feature.utils._filtering import _getKind
 from brainpipe.feature.utils._feat import (_manageWindow, _manageFrequencies,
-                                        normalize, _checkref)
-from brainpipe.statistics import (perm_swap, perm_metric, perm_2pvalue,
-                                  maxstat, circ_rtest)
+                                           _manageOutput, _manageChunk,
+                                           normalize, _checkref)
+from brainpipe.statistics import (perm_swapidx, perm_metric, circ_r,
+                                  circ_rtest)
+from brainpipe.statistics.permutations import permtail
 from brainpipe.visual.cmon_plt import tilerplot
+from brainpipe.system.cache import cached
 
+# Default memory budget of the permutations (in bytes) :
+_PERMMEMORY = 512 * 2**20
 
 
 __all__ = ['sigfilt',
@@ -21,7 +26,8 @@ __all__ = ['sigfilt',
            'power',
            'TF',
            'phase',
-           'PLF'
+           'PLF',
+           'spectral_bundle'
            ]
 
 
@@ -48,6 +54,10 @@ docsignal = """norm: int, optional [def: None]
 supfilter = """
         kwargs: supplementar arguments for filtering
 """ + docfilter + """
+        dtype: numpy type, optional [def: np.float64]
+            Precision of the feature. Use np.float32 to divide the memory
+            usage by two. The precision is kept through windowing,
+            normalization and statistics.
 
 .. automethod:: get"""
 
@@ -92,6 +102,11 @@ class _spectral(tilerplot):
             Define a specific time vector
 
     """
+    # Parameters of the feature (cache key) and attributes set by get() :
+    _cacheattr = ['_sf', '_npts', 'f', '_split', '_window', '_baseline',
+                  '_norm', '_kind', '_fobj', '_meanT']
+    _cachestate = ['_statmeth', '_n_perm', '_2t', '_mxst', '_metric',
+                   '_max_memory', '_approx']
 
     def __init__(self, sf, npts, kind, f, baseline, norm, method, window,
                  width, step, split, time, meanT, **kwargs):
@@ -105,6 +120,11 @@ class _spectral(tilerplot):
         self.f, self._fSplit, self._fSplitIndex = _manageFrequencies(
             f, split=split)
         # Get variables :
+        warnmsg = 'You define a normalization but no baseline has been' + \
+                  ' specified. Normalization will be ignore'
+        if (norm is not None) and (baseline is None):
+            warn(warnmsg)
+            norm = None
         self._baseline = baseline
         self._norm = norm
         self._width = width
@@ -128,13 +148,18 @@ class _spectral(tilerplot):
                                wi=self._width, sp=self._split)
         return powStr+extractStr+')'
 
+    @cached
     def get(self, x, statmeth=None, tail=2, n_perm=200, metric='m_center',
-            maxstat=False, n_jobs=-1):
+            maxstat=False, n_jobs=-1, out=None, max_memory=None,
+            approx=False):
         """Get the spectral feature of the signal x.
 
         Args:
             x: array
-                Data with a shape of (n_electrodes x n_pts x n_trials)
+                Data with a shape of (n_electrodes x n_pts x n_trials). x can
+                also be a memory-mapped array (np.memmap, np.load(...,
+                mmap_mode='r')) or an HDF5 dataset. In that case, only the
+                electrodes of the current chunk are loaded in memory.
 
         Kargs:
             statmeth: string, optional, [def: None]
@@ -171,10 +196,29 @@ class _spectral(tilerplot):
                 Control the number of jobs to extract features. If
                 n_jobs = -1, all the jobs are used.
 
+            out: string/array, optional, [def: None]
+                Where to write the feature. Use a path to a .npy file to
+                write it into a new memory-mapped array, or give a
+                preallocated array, np.memmap or HDF5 dataset with the
+                shape of xF. Each chunk of electrodes is directly written
+                into out.
+
+            max_memory: int, optional, [def: None]
+                Memory budget (in bytes) used to define the number of
+                electrodes processed per chunk. If None, all the electrodes
+                are processed at once. The permutations are also evaluated
+                by chunks which fit in this budget (512Mo if None).
+
+            approx: bool, optional, [def: False]
+                For the 'wilcoxon' method, use the normal approximation of
+                the distribution of the statistic instead of the exact
+                distribution (faster, for large number of trials).
+
         Return:
             xF: array
                 The un/normalized feature of x, with a shape of
-                (n_frequency x n_electrodes x n_window x n_trials)
+                (n_frequency x n_electrodes x n_window x n_trials). If out is
+                not None, xF is out.
 
             pvalues: array
                 p-values with a shape of (n_frequency x n_electrodes x n_window)
@@ -185,38 +229,50 @@ class _spectral(tilerplot):
         self._2t = tail
         self._mxst = maxstat
         self._metric = metric
+        self._max_memory = max_memory
+        self._approx = approx
 
         # Check input size :
         if len(x.shape) == 2:
-            x = x[np.newaxis, ...]
+            x = np.asarray(x)[np.newaxis, ...]
         if x.shape[1] != self._npts:
             raise ValueError('The second dimension must be '+str(self._npts))
-        nfeat = x.shape[0]
-        warnmsg = 'You define a normalization but no baseline has been' + \
-                  ' specified. Normalization will be ignore'
-        if (self._norm is not None) and (self._baseline is None):
-            warn(warnmsg)
-            self._norm = None
+        nfeat, _, ntrials = x.shape
 
         # Check statistical method :
         if statmeth is not None:
             _checkref('statmeth', statmeth, ['permutation', 'wilcoxon', 'kruskal'])
 
-        # run feature computation:
-        data = Parallel(n_jobs=n_jobs, prefer='threads')(
-            delayed(_get)(x[k, ...], self) for k in range(nfeat))
-        xF, pvalues = zip(*data)
-
-        # Re-organize data :
-        xF = np.swapaxes(np.array(xF), 0, 1)
-        if pvalues[0] is not None:
-            pvalues = np.swapaxes(np.array(pvalues), 0, 1)
-        else:
-            pvalues = None
+        # Output and chunks of electrodes :
+        dtype = self._fobj._dtype
+        nwin = self._npts if self._window is None else len(self._window)
+        shape = (len(self._fSplitIndex), nfeat, nwin)
+        if not self._meanT:
+            shape += (ntrials,)
+        xF = _manageOutput(out, shape, dtype)
+        nbytes = 4 * len(self._fSplit) * self._npts * ntrials * dtype.itemsize
+        chunk = _manageChunk(max_memory, nbytes, nfeat)
+        pvalues = None
 
-        # Remove last dimension (for TF):
-        if self._meanT:
-            xF = xF[..., 0]
+        # run feature computation:
+        for c0 in range(0, nfeat, chunk):
+            c1 = min(c0 + chunk, nfeat)
+            xc = np.asarray(x[c0:c1, ...])
+            data = Parallel(n_jobs=n_jobs, prefer='threads')(
+                delayed(_get)(xc[k, ...], self) for k in range(c1 - c0))
+            del xc
+            # Write the chunk :
+            block = np.zeros((shape[0], c1 - c0) + shape[2::], dtype=dtype)
+            for k in range(c1 - c0):
+                xFk, pv = data[k]
+                block[:, k, ...] = xFk[..., 0] if self._meanT else xFk
+                if pv is not None:
+                    if pvalues is None:
+                        pvalues = np.ones((pv.shape[0], nfeat, pv.shape[1]))
+                    pvalues[:, c0 + k, :] = pv
+                data[k] = None
+            xF[:, c0:c1, ...] = block
+            del data, block
 
         return xF, pvalues
 
@@ -232,6 +288,11 @@ def _get(x, self):
     # Unpack args :
     bsl, norm = self._baseline, self._norm
     n_perm, statmeth = self._n_perm, self._statmeth
+    getstat = (n_perm != 0) and (bsl is not None) and (statmeth is not None)
+
+    # Windowed features are reduced band per band :
+    if self._window is not None:
+        return _getwin(x, self, getstat)
 
     # Get the filter properties and apply:
     fMeth = self._fobj.get(self._sf, self._fSplit, self._npts)
@@ -239,8 +300,10 @@ def _get(x, self):
     nf, npts, nt = xF.shape
 
     # Statistical evaluation :
-    if (n_perm is not 0) and (bsl is not None) and (statmeth is not None):
-        pvalues = _evalstat(self, xF, bsl)
+    if getstat:
+        xS, _ = binArray(xF, self._fSplitIndex, axis=0)
+        pvalues = _evalstat(self, xS, np.mean(xS[:, bsl[0]:bsl[1], :], 1))
+        del xS
     else:
         pvalues = None
 
@@ -257,17 +320,63 @@ def _get(x, self):
     # Mean Frequencies :
     xF, _ = binArray(xF, self._fSplitIndex, axis=0)
 
-    # Mean time :
-    if self._window is not None:
-        xF, _ = binArray(xF, self._window, axis=1)
-
     return xF, pvalues
 
 
-def _evalstat(self, x, bsl):
+def _getwin(x, self, getstat):
+    """Windowed sub get function.
+
+    Each band is extracted then directly reduced to the mean of each window
+    (and of the baseline), before the next band is computed. The forward
+    transform of the filter-bank methods is shared by all the bands.
+    Full-resolution features are never stored for all the bands at once.
+    Because the mean through time, trials and frequencies is linear,
+    normalizing the windows by the baseline is the same as normalizing the
+    full-resolution feature.
+    """
+    # Unpack args :
+    bsl, norm = self._baseline, self._norm
+    nsplit, nwin, nt = len(self._fSplit), len(self._window), x.shape[1]
+    dtype = self._fobj._dtype
+
+    # Windowed feature and mean baseline of each (splitted) band :
+    xW = np.zeros((nsplit, nwin, nt), dtype=dtype)
+    xFm = np.zeros((nsplit, nt), dtype=dtype) if bsl is not None else None
+    fMeth = self._fobj.get(self._sf, self._fSplit, self._npts)
+    for i0, i1, xF in self._fobj.iterapply(x, fMeth, self._fSplitIndex):
+        if bsl is not None:
+            xFm[i0:i1, :] = np.mean(xF[:, bsl[0]:bsl[1], :], 1)
+        xW[i0:i1, ...], _ = binArray(xF, self._window, axis=1)
+        del xF
+
+    # Statistical evaluation :
+    if getstat:
+        pvalues = _evalstat(self, binArray(xW, self._fSplitIndex, axis=0)[0],
+                            binArray(xFm, self._fSplitIndex, axis=0)[0])
+    else:
+        pvalues = None
+
+    # Mean through trials:
+    if self._meanT:
+        xW = np.mean(xW[..., np.newaxis], 2)
+        xFm = np.mean(xFm, 1, keepdims=True) if bsl is not None else None
+
+    # Normalize power :
+    if (norm is not None) and (bsl is not None):
+        baseline = np.tile(xFm[:, np.newaxis, :], [1, nwin, 1])
+        xW = normalize(xW, baseline, norm=norm)
+
+    # Mean Frequencies :
+    xW, _ = binArray(xW, self._fSplitIndex, axis=0)
+
+    return xW, pvalues
+
+
+def _evalstat(self, x, xFm):
     """Statistical evaluation of features
 
-    [x] = [xn] = (nFce, npts, nTrials)
+    [x] = (nFce, nWin, nTrials) : feature averaged in frequency and time
+    [xFm] = (nFce, nTrials) : mean of the baseline
     """
     # Unpack variables:
     statmeth = self._statmeth
@@ -275,16 +384,6 @@ def _evalstat(self, x, bsl):
     tail = self._2t
     maxst = self._mxst
 
-    # Mean Frequencies :
-    x, _ = binArray(x, self._fSplitIndex, axis=0)
-
-    # Get the baseline and set to same shape of x:
-    xFm = np.mean(x[:, bsl[0]:bsl[1], :], 1)
-
-    # Mean time :
-    if self._window is not None:
-        x, _ = binArray(x, self._window, axis=1)
-
     # Repeat baseline:
     baseline = np.tile(xFm[:, np.newaxis, :], [1, x.shape[1], 1])
 
@@ -294,37 +393,47 @@ def _evalstat(self, x, bsl):
 
     # Switch between methods:
     #   -> Permutations
-    # Loops on time and matrix for frequency (avoid RAM usage but increase speed)
+    # All time points and frequencies are evaluated at once, by chunks of
+    # permutations (the swaps of the time point pts and of the permutation k
+    # are the ones of the random state pts+k)
     if statmeth == 'permutation':
         # Get metric:
         fcn = perm_metric(self._metric)
         # Apply metric to x and baseline:
         xN = fcn(x, baseline).mean(axis=2)
-        # For each time points:
-        for pts in range(npts):
-            # Randomly swap x // baseline :
-            perm = perm_swap(x[:, pts, :], baseline[:, pts, :],
-                             n_perm=n_perm, axis=1, rndstate=0+pts)[0]
-            # Normalize permutations by baline:
-            perm = fcn(perm, baseline[:, pts, :]).mean(2)
+        # Trial swaps of every random states :
+        idx = perm_swapidx(2 * nt, npts + n_perm - 1, rndstate=0)[:, 0:nt]
+        ab = np.concatenate((x, baseline), axis=2)
+        bsl = xFm[:, np.newaxis, np.newaxis, :]
+        # Number of permutations per chunk :
+        max_memory = self._max_memory or _PERMMEMORY
+        nk = _manageChunk(max_memory, 3 * ab.nbytes // 2, n_perm)
+        count = np.zeros((nf, npts))
+        for k0 in range(0, n_perm, nk):
+            k = np.arange(k0, min(k0 + nk, n_perm))
+            # Swapped trials (nf, npts, nk, nt) :
+            kidx = idx[np.arange(npts)[:, np.newaxis] + k[np.newaxis, :], :]
+            perm = np.take_along_axis(ab[:, :, np.newaxis, :],
+                                      kidx[np.newaxis, ...], axis=3)
+            # Normalize permutations by baseline:
+            perm = np.moveaxis(fcn(perm, bsl).mean(3), 2, 0)
             # Maximum stat (correct through frequencies):
             if maxst:
-                perm = maxstat(perm, axis=1)
-            # Get pvalues :
-            pvalues[:, pts] = perm_2pvalue(xN[:, pts], perm, n_perm, tail=tail)
-
-    #   -> Wilcoxon // Kruskal-Wallis:
+                perm = np.max(perm, axis=1, keepdims=True)
+            # Count permutations (number of exceeding permutations) :
+            count += permtail(perm, xN, 1, tail=tail)
+            del perm, kidx
+        pvalues = count / n_perm
+        pvalues[pvalues == 0] = 1 / n_perm
+
+    #   -> Wilcoxon // Kruskal-Wallis (all the cells at once, along trials):
     else:
-        # Get the method:
+        baseline = np.broadcast_to(xFm[:, np.newaxis, :], x.shape)
         if statmeth == 'wilcoxon':
-            def fcn(a, b): return wilcoxon(a, b)[1]
+            method = 'approx' if self._approx else 'auto'
+            pvalues = wilcoxon(x, baseline, axis=-1, method=method)[1]
         elif statmeth == 'kruskal':
-            def fcn(a, b): return kruskal(a, b)[1]
-
-        # Apply:
-        ite = product(range(nf), range(npts))
-        for k, i in ite:
-            pvalues[k, i] = fcn(x[k, i, :], xFm[k, :])
+            pvalues = kruskal(x, baseline, axis=-1)[1]
 
     return pvalues
 
@@ -359,13 +468,15 @@ class amplitude(_spectral):
             - 'hilbert1': hilbert transform to a whole matrix
             - 'hilbert2': 2D hilbert transform
             - 'wavelet': wavelet transform
+            - 'fft': frequency-domain filter-bank
+            - 'multitaper': DPSS multitaper estimation
     """ + supfilter
 
     def __init__(self, sf, npts, f=[60, 200], baseline=None, norm=None,
                  method='hilbert1', window=None, width=None, step=None,
                  split=None, time=None, **kwargs):
         _checkref('method', method, ['hilbert', 'hilbert1', 'hilbert2',
-                  'wavelet'])
+                  'wavelet', 'fft', 'multitaper'])
         _spectral.__init__(self, sf, npts, 'amplitude', f, baseline, norm,
                            method, window, width, step, split, time,
                            False, **kwargs)
@@ -385,13 +496,15 @@ class power(_spectral):
             - 'hilbert1': hilbert transform to a whole matrix
             - 'hilbert2': 2D hilbert transform
             - 'wavelet': wavelet transform
+            - 'fft': frequency-domain filter-bank
+            - 'multitaper': DPSS multitaper estimation
     """ + supfilter
 
     def __init__(self, sf, npts, f=[60, 200], baseline=None, norm=None,
                  method='hilbert1', window=None, width=None, step=None,
                  split=None, time=None, **kwargs):
         _checkref('method', method, ['hilbert', 'hilbert1', 'hilbert2',
-                  'wavelet'])
+                  'wavelet', 'fft', 'multitaper'])
         _spectral.__init__(self, sf, npts, 'power', f, baseline, norm,
                            method, window, width, step, split, time,
                            False, **kwargs)
@@ -411,13 +524,15 @@ class TF(_spectral):
             - 'hilbert1': hilbert transform to a whole matrix
             - 'hilbert2': 2D hilbert transform
             - 'wavelet': wavelet transform
+            - 'fft': frequency-domain filter-bank
+            - 'multitaper': DPSS multitaper estimation
     """ + supfilter
 
     def __init__(self, sf, npts, f=(2, 200, 10, 5), baseline=None, norm=None,
                  method='hilbert1', window=None, width=None, step=None,
                  time=None, **kwargs):
         _checkref('method', method, ['hilbert', 'hilbert1', 'hilbert2',
-                  'wavelet'])
+                  'wavelet', 'fft', 'multitaper'])
         _spectral.__init__(self, sf, npts, 'power', f, baseline, norm,
                            method, window, width, step, None, time,
                            True, **kwargs)
@@ -435,14 +550,20 @@ class phase(_spectral):
             - 'hilbert': apply a hilbert transform to each column
             - 'hilbert1': hilbert transform to a whole matrix
             - 'hilbert2': 2D hilbert transform
+            - 'fft': frequency-domain filter-bank
+            - 'wavelet': phase of the complex Morlet wavelet coefficients
+            - 'multitaper': phase of the first DPSS taper
     """ + supfilter
+    _cachestate = ['_getstat']
 
     def __init__(self, sf, npts, f=[2, 4], method='hilbert', window=None,
                  width=None, step=None, time=None, **kwargs):
-        _checkref('method', method, ['hilbert', 'hilbert1', 'hilbert2'])
+        _checkref('method', method, ['hilbert', 'hilbert1', 'hilbert2',
+                  'fft', 'wavelet', 'multitaper'])
         _spectral.__init__(self, sf, npts, 'phase', f, None, None, method,
                            window, width, step, None, time, False, **kwargs)
 
+    @cached
     def get(self, x, getstat=True, n_jobs=-1):
         """Get the spectral phase of the signal x.
 
@@ -489,6 +610,39 @@ class phase(_spectral):
 def _phase(x, self):
     """Sub-phase function
     """
+    xF = _getphase(x, self)
+
+    # Get p-value (Rayleigh test of all the bands and time points at once):
+    if self._getstat:
+        pvalues = circ_rtest(xF, axis=2)[0]
+    else:
+        pvalues = None
+
+    return xF, pvalues
+
+
+def _plf(x, self):
+    """Sub-plf function
+
+    The PLF is the length of the mean resultant vector across trials. It is
+    obtained from the Rayleigh statistic (z = ntrials * plf**2) so that the
+    phase is extracted only once.
+    """
+    xF = _getphase(x, self)
+
+    # Get PLF and p-value :
+    if self._getstat:
+        pvalues, z = circ_rtest(xF, axis=2)
+        plf = np.sqrt(z / xF.shape[2])
+    else:
+        plf, pvalues = circ_r(xF, axis=2), None
+
+    return plf, pvalues
+
+
+def _getphase(x, self):
+    """Get the phase of x (nf, npts, nt)
+    """
     # Get the filter properties and apply:
     fMeth = self._fobj.get(self._sf, self._fSplit, self._npts)
     xF = self._fobj.apply(x, fMeth)
@@ -496,18 +650,8 @@ def _phase(x, self):
     # Mean time :
     if self._window is not None:
         xF, _ = binArray(xF, self._window, axis=1)
-    nf, npts, nt = xF.shape
-
-    # Get p-value:
-    if self._getstat:
-        pvalues = np.zeros((nf, npts), dtype=float)
-        for f in range(nf):
-            for k in range(npts):
-                pvalues[f, k] = circ_rtest(xF[f, k, :])[0]
-    else:
-        pvalues = None
 
-    return xF, pvalues
+    return xF
 
 
 class PLF(phase):
@@ -519,15 +663,17 @@ class PLF(phase):
             - 'hilbert': apply a hilbert transform to each column
             - 'hilbert1': hilbert transform to a whole matrix
             - 'hilbert2': 2D hilbert transform
+            - 'fft': frequency-domain filter-bank
+            - 'wavelet': phase of the complex Morlet wavelet coefficients
+            - 'multitaper': phase of the first DPSS taper
     """ + supfilter
 
     def __init__(self, sf, npts, f=[2, 4], method='hilbert', window=None,
                  width=None, step=None, time=None, **kwargs):
         phase.__init__(self, sf, npts, f=f, method=method, window=window,
                        width=width, step=step, time=time, **kwargs)
-        self.__phaO = phase(sf, npts, f=f, method=method, window=window,
-                            width=width, step=step, time=time, **kwargs)
 
+    @cached
     def get(self, x, getstat=True, n_jobs=-1):
         """Get the phase-locking factor of the signal x.
 
@@ -552,8 +698,114 @@ class PLF(phase):
             pvalues: array
                 p-values with a shape of (n_frequency x n_electrodes x n_window)
         """
-        # Get phase and p-values
-        xf, pval = self.__phaO.get(x, getstat=getstat, n_jobs=n_jobs)
-        # Get plf
-        plf = np.abs(np.exp(1j*(xf)).mean(3))
-        return plf, pval
\ No newline at end of file
+        # Check input size :
+        if len(x.shape) == 2:
+            x = x[np.newaxis, ...]
+        if x.shape[1] != self._npts:
+            raise ValueError('The second dimension must be '+str(self._npts))
+        nfeat = x.shape[0]
+        self._getstat = getstat
+        # run plf computation (the phase of each electrode is reduced to the
+        # mean resultant length across trials) :
+        data = Parallel(n_jobs=n_jobs)(
+            delayed(_plf)(x[k, ...], self) for k in range(nfeat))
+        plf, pvalues = zip(*data)
+        # Manage output type:
+        if pvalues[0] is None:
+            pvalues = None
+        else:
+            pvalues = np.array(pvalues)
+
+        return np.array(plf), pvalues
+
+# ------------------------------------------------------------
+# MULTI-OUTPUT EXTRACTION
+# ------------------------------------------------------------
+class spectral_bundle(_spectral):
+
+    """Extract several spectral informations of the same frequency bands.
+
+    Each band is filtered and transformed once. The requested kinds are all
+    derived from the same complex analytic signal.
+    """
+    __doc__ += _spectral.__doc__
+    __doc__ += """kinds: list, optional, [def: ['signal', 'phase', 'amplitude', 'power']]
+        List of informations to extract. Use 'signal' (real part of the
+        analytic signal, i.e the filtered signal for filter-based methods),
+        'phase', 'amplitude' or 'power'.
+
+    method: string
+        Method to transform the signal. Possible values are:
+            - 'hilbert': apply a hilbert transform to each column
+            - 'hilbert1': hilbert transform to a whole matrix
+            - 'hilbert2': 2D hilbert transform
+            - 'wavelet': complex Morlet wavelet transform
+            - 'fft': frequency-domain filter-bank
+            - 'multitaper': DPSS multitaper estimation
+    """ + supfilter
+
+    def __init__(self, sf, npts, f=[2, 4], kinds=['signal', 'phase',
+                 'amplitude', 'power'], method='hilbert', window=None,
+                 width=None, step=None, time=None, **kwargs):
+        _checkref('method', method, ['hilbert', 'hilbert1', 'hilbert2',
+                  'wavelet', 'fft', 'multitaper'])
+        if isinstance(kinds, str):
+            kinds = [kinds]
+        for k in kinds:
+            _checkref('kinds', k, ['signal', 'phase', 'amplitude', 'power'])
+        self._kinds = list(kinds)
+        _spectral.__init__(self, sf, npts, 'analytic', f, None, None, method,
+                           window, width, step, None, time, False, **kwargs)
+
+    def get(self, x, n_jobs=-1):
+        """Get the spectral informations of the signal x.
+
+        Args:
+            x: array
+                Data with a shape of (n_electrodes x n_pts x n_trials)
+
+        Kargs:
+            n_jobs: integer, optional, [def: -1]
+                Control the number of jobs to extract features. If
+                n_jobs = -1, all the jobs are used.
+
+        Return:
+            xF: dict
+                Dictionary with one entry per kind. Each feature has a shape
+                of (n_frequency x n_electrodes x n_window x n_trials)
+        """
+        # Check input size :
+        if len(x.shape) == 2:
+            x = x[np.newaxis, ...]
+        if x.shape[1] != self._npts:
+            raise ValueError('The second dimension must be '+str(self._npts))
+        nfeat = x.shape[0]
+        # run feature computation:
+        data = Parallel(n_jobs=n_jobs, prefer='threads')(
+            delayed(_bundle)(x[k, ...], self) for k in range(nfeat))
+        # Re-organize data :
+        return {k: np.swapaxes(np.array([i[k] for i in data]), 0, 1)
+                for k in self._kinds}
+
+
+def _bundle(x, self):
+    """Sub-bundle function
+
+    Get the analytic signal of each band, then derive every kind.
+    """
+    # Get the filter properties and apply:
+    fMeth = self._fobj.get(self._sf, self._fSplit, self._npts)
+    xA = self._fobj.apply(x, fMeth)
+
+    xF = {}
+    for k in self._kinds:
+        xk = _getKind(k)(xA)
+        if np.iscomplexobj(xk):
+            xk = xk.real
+        # Mean time :
+        if self._window is not None:
+            xk, _ = binArray(xk, self._window, axis=1)
+        xF[k] = xk
+    del xA
+
+    return xF
@@ -1,3 +1,4 @@
+import hashlib
 from joblib import Parallel, delayed
 from psutil import cpu_count
 
@@ -11,14 +12,19 @@ from brainpipe.feature.utils._feat import (_manageWindow, _manageFrequencies,
 from brainpipe.feature.filtering import fextract, docfilter
 from brainpipe.feature.coupling.pac._pac import *
 from brainpipe.feature.coupling.pac.pacmeth import *
+from brainpipe.feature.coupling.pac import pacmeth
+from brainpipe.feature.coupling.pac.pacmeth import _binMean
 from brainpipe.feature.utils._feat import normalize
-from brainpipe.feature import power, phase, sigfilt
+from brainpipe.feature import power, spectral_bundle
 from brainpipe.tools import binarize, binArray
-from brainpipe.statistics import perm_2pvalue, circ_corrcc, circ_rtest
+from brainpipe.statistics import perm_2pvalue, circ_rtest
+from brainpipe.statistics.circstat import _corr
 from brainpipe.visual.cmon_plt import tilerplot
 from brainpipe.visual import addLines
+from brainpipe.system.cache import cached, _hash
 
-__all__ = ['pac',
+__all__ = ['cfcsession',
+           'pac',
            'PhaseLockedPower',
            'erpac', 
            'pfdphase',
@@ -54,34 +60,82 @@ Footnotes = """
 
 """
 
+class cfcsession(object):
+
+    """Share the filtered signals between coupling measures
+
+    Inside a session, each signal is filtered only once for a given set of
+    filtering parameters (method, cycle, frequency bands...). The filtered
+    phase and amplitude are then re-used by every coupling measure (pac,
+    erpac, pfdphase and PLV) computed on the same data:
+
+        >>> with cfcsession():
+        >>>     mvl = pac(sf, npts, Id='100').get(x, x)
+        >>>     kl = pac(sf, npts, Id='200').get(x, x)
+        >>>     xerpac = erpac(sf, npts).get(x, x)
+        >>>     pfp = pfdphase(sf, npts).get(x, x)
+
+    The filtered signals are kept in memory until the end of the session.
+    """
+
+    _active = None
+
+    def __init__(self):
+        self._data = {}
+        self._previous = None
+
+    def __enter__(self):
+        self._previous, cfcsession._active = cfcsession._active, self
+        return self
+
+    def __exit__(self, *args):
+        cfcsession._active = self._previous
+        self.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        """Remove every filtered signals of the session."""
+        self._data = {}
+
+
 def cfcparafilt(xpha, xamp, n_jobs, self):
-    """Parallel filtering through electrode dimension
+    """Parallel filtering of phase and amplitude through electrode dimension
     """
-    nelec = xpha.shape[0]
-    # Run para filtering :
-    data = Parallel(n_jobs=n_jobs)(delayed(_cfcparafilt)(
-            xpha[e, ...], xamp[e, ...], self,
-            ) for e in range(nelec))
-    pha, amp = zip(*data)
-    return np.array(pha), np.array(amp)
+    return _cfcfilt(xpha, self._pha, n_jobs, self), _cfcfilt(
+        xamp, self._amp, n_jobs, self)
 
 
-def _cfcparafilt(xpha, xamp, self):
-    """Sub parallel filtering function
+def _cfcfilt(x, fobj, n_jobs, self):
+    """Filter each electrode of x with the fextract object fobj. Inside a
+    cfcsession, x is only filtered once.
     """
-    # Get the filter for phase/amplitude properties :
-    phaMeth = self._pha.get(self._sf, self._pha.f, self._npts)
-    ampMeth = self._amp.get(self._sf, self._amp.f, self._npts)
-    # Filt phase and amplitude :
-    pha = self._pha.apply(xpha, phaMeth)
-    amp = self._amp.apply(xamp, ampMeth)
-    return pha, amp
+    session = cfcsession._active
+    if session is not None:
+        h = hashlib.blake2b(digest_size=20)
+        _hash(h, (x, fobj, self._sf, self._npts))
+        key = h.hexdigest()
+        if key in session._data:
+            return session._data[key]
+    # Get the filter and run para filtering :
+    fMeth = fobj.get(self._sf, fobj.f, self._npts)
+    xf = np.array(Parallel(n_jobs=n_jobs)(delayed(fobj.apply)(
+            x[e, ...], fMeth) for e in range(x.shape[0])))
+    if session is not None:
+        # Shared arrays can't be modified :
+        xf.flags.writeable = False
+        session._data[key] = xf
+    return xf
 
 
 class _coupling(tilerplot):
 
     """
     """
+    # Parameters of the coupling (cache key) and attributes set by get() :
+    _cacheattr = ['_sf', '_npts', '_pha', '_amp', '_window']
+    _cachestate = []
 
     def __init__(self, pha_f, pha_kind, pha_meth, pha_cycle,
                  amp_f, amp_kind, amp_meth, amp_cycle,
@@ -155,8 +209,8 @@ class pac(_coupling):
                     - '2': Swap trials amplitude [#f4]_
                     - '3': Shuffle phase time-series
                     - '4': Shuffle amplitude time-series
-                    - '5': Time lag [#f1]_ [NOT IMPLEMENTED YET]
-                    - '6': Circular shifting [NOT IMPLEMENTED YET]
+                    - '5': Time lag [#f1]_ (see tlag)
+                    - '6': Circular shifting of the amplitude of each trial
 
                 * Third digit: refer to the normalization method for correction:
 
@@ -195,13 +249,21 @@ class pac(_coupling):
             Some pac method (like Kullback-Leibler Distance or Heights Ratio) need
             a binarization of the phase. nbins control the number of bins.
 
+        tlag: tuple/list, optional, [def: None]
+            Range (min, max) of the time lags (in samples) of the amplitude
+            for the time lag surrogates (second digit of Id is '5'). The same
+            random lag is applied to all the trials. If None, the lag can be
+            any lag of the window.
+
     """
     __doc__ += windoc + docfilter + Footnotes
+    _cacheattr = _coupling._cacheattr + ['Id', '_nbins', '_tlag']
+    _cachestate = ['n_perm', 'p', '_matricial']
 
     def __init__(self, sf, npts, Id='113', pha_f=[2, 4], pha_meth='hilbert',
                  pha_cycle=3, amp_f=[60, 200], amp_meth='hilbert', amp_cycle=6,
                  nbins=18, window=None, width=None, step=None, time=None,
-                 **kwargs):
+                 tlag=None, **kwargs):
         # Check pha and amp methods:
         _checkref('pha_meth', pha_meth, ['hilbert', 'hilbert1', 'hilbert2'])
         _checkref('amp_meth', amp_meth, ['hilbert', 'hilbert1', 'hilbert2'])
@@ -234,10 +296,12 @@ class pac(_coupling):
                            amp_f, amp_kind, amp_meth, amp_cycle,
                            sf, npts, window, width, step, time, **kwargs)
         # Get pac model :
-        _, _, _, ModelStr, SurStr, NormStr = CfcSettings(Id, nbins)
+        _, _, _, ModelStr, SurStr, NormStr = CfcSettings(Id, nbins,
+                                                         tlag=tlag)
         self.model = ['Method : '+ModelStr, 'Surrogates : '+SurStr,
                       'Normalization : '+NormStr]
         self._nbins = nbins
+        self._tlag = tlag
 
     def __str__(self):
         phafilt = 'Phase : '+str(self._pha)
@@ -248,6 +312,7 @@ class pac(_coupling):
 
         return cfcStr+phafilt+',\n'+ampfilt+')'
 
+    @cached
     def get(self, xpha, xamp, n_perm=200, p=0.05, matricial=False, n_jobs=-1):
         """Get the normalized cfc mesure between an xpha and xamp signals.
 
@@ -268,10 +333,11 @@ class pac(_coupling):
                 p-value for the statistical method of Ozkurt 2012.
 
             matricial: bool, optional, [def: False]
-                Some methods can work in matricial computation. This can lead
-                to a 10x or 30x time faster. But, please, monitor your RAM usage
-                beacause this parameter can use a lot of RAM. So, turn this parameter
-                in case of small computation.
+                Surrogates are computed by blocks of permutations. By default,
+                the size of a block is bounded by a memory budget. If True,
+                all the permutations are computed in a single block. Please,
+                monitor your RAM usage beacause this parameter can use a lot
+                of RAM. So, turn this parameter in case of small computation.
 
             n_jobs: integer, optional, [def: -1]
                 Control the number of jobs for parallel computing. Use 1, 2, ..
@@ -309,9 +375,16 @@ class pac(_coupling):
         else:
             surJob, elecJob = 1, 1
 
+        # Filt the phase and amplitude of all the electrodes inside a
+        # cfcsession (shared signals). Otherwise, each electrode is filtered
+        # in its own job :
+        filt = cfcsession._active is None
+        if not filt:
+            xpha, xamp = cfcparafilt(xpha, xamp, n_jobs, self)
+
         # Get the unormalized cfc and surogates:
         cfcsu = Parallel(n_jobs=elecJob)(delayed(_cfcFiltSuro)(
-            xpha[k, ...], xamp[k, ...], surJob, self) for k in range(N))
+            xpha[k, ...], xamp[k, ...], surJob, self, filt) for k in range(N))
         uCfc, Suro, mSuro, stdSuro = zip(*cfcsu)
         uCfc = np.array(uCfc)
 
@@ -386,51 +459,54 @@ class PhaseLockedPower(object):
         self._baseline = baseline
         self._powObj = power(
             sf, npts, f=f, baseline=baseline, norm=0, time=time, **powArgs)
-        self._phaObj = phase(sf, npts, f=pha)
-        self._sigObj = sigfilt(sf, npts, f=pha)
+        # Phase and filtered signal share the same filtering :
+        self._phaObj = spectral_bundle(sf, npts, f=pha,
+                                       kinds=['phase', 'signal'])
 
     def get(self, x, cue):
         """Get power phase locked
 
         Args:
             x: array
-                Data of shape (npt, ntrials)
+                Data of shape (npt, ntrials) or (n_electrodes, npts, ntrials)
 
             cue: integer
                 Cue to align time-frequency maps.
 
         Returns:
             xpow, xpha, xsig: repectively realigned power, phase and filtered
-            signal
+            signal. For a 2D x, xpow has a shape of (nfce, npts) and xpha,
+            xsig (npts, ntrials). For a 3D x, xpow has a shape of
+            (nfce, n_electrodes, npts) and xpha, xsig
+            (n_electrodes, npts, ntrials).
         """
         # Find cue according to define time vector
         self._cue = cue
         xvec = self._powObj.xvec
         cue = np.abs(np.array(xvec)-cue).argmin()
         self._cueIdx = cue
-        # Extact power, phase and filtered signal:
-        xpow = np.squeeze(self._powObj.get(x)[0])
-        xpha = np.squeeze(self._phaObj.get(x)[0])
-        xsig = np.squeeze(self._sigObj.get(x)[0])
-        # Re-align:
-        xpha_s, xpow_s, xsig_s = np.empty_like(
-            xpha), np.empty_like(xpow), np.empty_like(xsig)
-        nTrials = xsig.shape[1]
-        for k in range(nTrials):
-            # Get shifting:
-            move = self._PeakDetection(xsig[:, k], cue)
-            # Apply shifting:
-            xpha_s[:, k] = self._ShiftSignal(np.matrix(xpha[:, k]), move)
-            xsig_s[:, k] = self._ShiftSignal(np.matrix(xsig[:, k]), move)
-            xpow_s[:, :, k] = self._ShiftSignal(xpow[:, :, k], move)
-        xpow_s = np.mean(xpow_s, 2)
+        is2D = (x.ndim == 2)
+        if is2D:
+            x = x[np.newaxis, ...]
+        # Extact power (nfce, nelec, npts, ntrials), phase and filtered
+        # signal (nelec, npts, ntrials) :
+        xpow = self._powObj.get(x)[0]
+        xbdl = self._phaObj.get(x)
+        xpha, xsig = xbdl['phase'][0, ...], xbdl['signal'][0, ...]
+        # Re-align all the trials at once :
+        move = self._PeakDetection(xsig, cue)
+        xpha_s = self._ShiftSignal(xpha, move)
+        xsig_s = self._ShiftSignal(xsig, move)
+        xpow_s = self._ShiftSignal(xpow, move[np.newaxis, ...]).mean(-1)
         # Normalize mean power:
-        if self._normBck is not 0:
+        if (self._normBck not in [None, 0]) and (self._baseline is not None):
             bsl = self._baseline
-            xFm = np.mean(xpow_s[:, bsl[0]:bsl[1]], 1)
-            baseline = np.tile(xFm[:, np.newaxis], [1, xpow_s.shape[1]])
+            xFm = np.mean(xpow_s[..., bsl[0]:bsl[1]], -1, keepdims=True)
+            baseline = np.tile(xFm, [1] * (xFm.ndim - 1) + [xpow_s.shape[-1]])
             xpow_s = normalize(xpow_s, baseline, norm=self._normBck)
 
+        if is2D:
+            return xpow_s[:, 0, :], xpha_s[0, ...], xsig_s[0, ...]
         return xpow_s, xpha_s, xsig_s
 
     def tflockedplot(self, xpow, sig, cmap='viridis', vmin=None, vmax=None,
@@ -525,27 +601,34 @@ class PhaseLockedPower(object):
     def _PeakDetection(sig, cue):
         """Detect peaks in a signal and return the shifting length
         corresponding to the defined cue
-        sig: vector
+        sig: array of shape (..., npts, ntrials)
         cue: integer (in sample)
+        Return the shifting length of each trial (..., ntrials). Trials
+        without any peak are not shifted.
         """
-        peaks = []
-        for k in range(len(sig)-1):
-            if (sig[k-1] < sig[k]) and (sig[k] > sig[k+1]):
-                peaks.append(k)
-        minPeak = peaks[np.abs(np.array(peaks)-cue).argmin()]
-        return minPeak-cue
+        npts = sig.shape[-2]
+        # Local maxima of every trials (the first sample is compared to the
+        # last one) :
+        prev = np.roll(sig, 1, axis=-2)
+        peaks = np.zeros(sig.shape, dtype=bool)
+        peaks[..., 0:-1, :] = (prev[..., 0:-1, :] < sig[..., 0:-1, :]) & (
+            sig[..., 0:-1, :] > sig[..., 1::, :])
+        # Closest peak to the cue :
+        dist = np.abs(np.arange(npts) - cue).astype(float)[:, np.newaxis]
+        dist = np.where(peaks, dist, np.inf)
+        minPeak = dist.argmin(axis=-2)
+        return np.where(peaks.any(axis=-2), minPeak - cue, 0)
 
     @staticmethod
     def _ShiftSignal(sig, move):
+        """Shift each trial of sig (..., npts, ntrials) by move (..., ntrials)
+        samples. Samples outside of the signal are set to zero.
         """
-        """
-        npts = sig.shape[1]
-        sigShift = np.zeros(sig.shape)
-        if move >= 0:
-            sigShift[:, 0:npts-move] = sig[:, move::]
-        elif move < 0:
-            sigShift[:, np.abs(move)::] = sig[:, 0:npts-np.abs(move)]
-        return sigShift
+        npts = sig.shape[-2]
+        idx = np.arange(npts)[:, np.newaxis] + move[..., np.newaxis, :]
+        valid = (idx >= 0) & (idx < npts)
+        idx = np.broadcast_to(np.clip(idx, 0, npts - 1), sig.shape)
+        return np.where(valid, np.take_along_axis(sig, idx, axis=-2), 0.)
 
 
 class erpac(_coupling):
@@ -606,6 +689,7 @@ class erpac(_coupling):
                            amp_f, 'amplitude', amp_meth, amp_cycle,
                            sf, npts, window, width, step, time, **kwargs)
 
+    @cached
     def get(self, xpha, xamp, n_perm=200, n_jobs=-1):
         """Get the erpac mesure between an xpha and xamp signals.
 
@@ -640,10 +724,7 @@ class erpac(_coupling):
         """
         # Check and get methods:
         xpha, xamp = _cfcCheck(xpha, xamp, self._npts)
-        npha, namp = self._nPha, self._nAmp
-        phaMeth = self._pha.get(self._sf, self._pha.f, self._npts)
-        ampMeth = self._amp.get(self._sf, self._amp.f, self._npts)
-        
+
         # Extract phase and amplitude:
         nelec, npts, ntrials = xpha.shape
         xp, xa = cfcparafilt(xpha, xamp, n_jobs, self)
@@ -652,49 +733,61 @@ class erpac(_coupling):
         if not (self._window == [(0, npts)]):
             xp = binArray(xp, self._window, axis=2)[0]
             xa = binArray(xa, self._window, axis=2)[0]
-            npts = xp.shape[2]
-
-        # Extract ERPAC and surrogates:
-        iteract = product(range(nelec), range(npha), range(namp))
-        xerpac = np.zeros((nelec, npha, namp, npts))
-        pval = np.empty_like(xerpac)
-        for e, p, a in iteract:
-            xerpac[e, p, a, :], pval[e, p, a, :] = _erpac(xp[e, p, ...],
-                                  xa[e, a, ...], n_perm, n_jobs)
-        
-        return xerpac, pval
 
-def _erpac(xp, xa, n_perm, n_jobs):
+        # Extract ERPAC and surrogates of all electrodes, phase and amplitude:
+        return _erpac(xp, xa, n_perm)
+
+
+def _erpac(xp, xa, n_perm):
     """Sub erpac function
-    [xp] = [xa] = (npts, ntrials)
+    [xp] = (nelec, npha, npts, ntrials), [xa] = (nelec, namp, npts, ntrials)
+    Return xerpac and pvalue of shape (nelec, npha, namp, npts)
     """
-    npts, ntrials = xp.shape
-    # Compute ERPAC
-    xerpac = np.zeros((npts,))
-    for t in range(npts):
-        xerpac[t] = circ_corrcc(xp[t, :], xa[t, :])[0]
-
-    # Compute surrogates:
-    data = Parallel(n_jobs=n_jobs)(delayed(_erpacSuro)(
-            xp, xa, npts, ntrials) for pe in range(n_perm))
-    suro = np.array(data)
+    nelec, npha, npts, ntrials = xp.shape
+    namp = xa.shape[1]
+    # The same trials permutation is used for all time points :
+    perm = np.array([np.random.permutation(ntrials) for k in range(n_perm)])
+    xerpac = np.zeros((nelec, npha, namp, npts))
+    suro = np.zeros((nelec, npha, namp, npts, n_perm))
+
+    # Blocks of phase bands and of permutations of each electrode, so that
+    # the temporaries stay within the memory budget :
+    unit = 32 * namp * npts * ntrials
+    pblk = int(max(1, min(pacmeth._SUROMEMORY // unit, npha)))
+    bsize = int(max(1, min(pacmeth._SUROMEMORY // (unit * pblk), n_perm)))
+    for e in range(nelec):
+        # (npha, namp, npts, nperm, ntrials) broadcasting :
+        xae = xa[e, np.newaxis, ...]
+        for p in range(0, npha, pblk):
+            sl = slice(p, min(p + pblk, npha))
+            # The sine / cosine correlation of the phase does not depend on
+            # the permutation :
+            xpe = xp[e, sl, np.newaxis, :, np.newaxis, :]
+            sa, ca = np.sin(xpe), np.cos(xpe)
+            rcs = _corr(sa, ca, -1)
+            # Compute ERPAC across trials of each time point :
+            xerpac[e, sl] = _circlincorr(xae[..., np.newaxis, :], sa, ca,
+                                         rcs)[..., 0]
+            # Compute surrogates by blocks of permutations :
+            for k in range(0, n_perm, bsize):
+                blk = slice(k, min(k + bsize, n_perm))
+                suro[e, sl, ..., blk] = _circlincorr(xae[..., perm[blk]], sa,
+                                                     ca, rcs)
 
     # Normalize erpac:
-    xerpac = (xerpac - suro.mean(0))/suro.std(0)
+    xerpac = (xerpac - suro.mean(-1))/suro.std(-1)
 
     # Get p-value:
     pvalue = norm.cdf(-np.abs(xerpac))*2
 
     return xerpac, pvalue
 
-def _erpacSuro(xp, xa, npts, ntrials):
-    """Parallel surrogates
-    """
-    # Permute ntrials (only for amplitude):
-    perm = np.random.permutation(ntrials)
-    for t in range(npts):
-        suro = circ_corrcc(xp[t, :], xa[t, perm])[0]
-    return suro
+
+def _circlincorr(x, sa, ca, rcs):
+    """Circular-linear correlation along the last axis, from the sine and
+    cosine of the phase and their correlation rcs"""
+    rxs, rxc = _corr(x, sa, -1), _corr(x, ca, -1)
+    return np.sqrt((rxc**2 + rxs**2 - 2*rxc*rxs*rcs)/(1 - rcs**2))
 
 
 class pfdphase(_coupling):
@@ -734,6 +827,7 @@ class pfdphase(_coupling):
 
     """
     __doc__ += windoc
+    _cacheattr = _coupling._cacheattr + ['_nbins']
 
     def __init__(self, sf, npts, nbins=18, pha_f=[2, 4], pha_meth='hilbert',
                  pha_cycle=3, amp_f=[60, 200], amp_meth='hilbert', amp_cycle=6,
@@ -764,6 +858,7 @@ class pfdphase(_coupling):
                            sf, npts, window, width, step, time, **kwargs)
         self._nbins = nbins
 
+    @cached
     def get(self, xpha, xamp, n_jobs=-1):
         """Get the preferred phase
 
@@ -786,25 +881,26 @@ class pfdphase(_coupling):
 
         Returns:
             pfp: array
-                The preferred phase extracted from the mean of trials of size :
-                (n_amplitude x n_phase x n_electrodes x n_windows)
+                The preferred phase (in degrees) extracted from each trial of
+                size :
+                (n_amplitude x n_phase x n_electrodes x n_windows x n_trials)
 
             prf: array
-                The preferred phase extracted from each trial of size :
-                (n_amplitude x n_phase x n_electrodes x n_windows x n_trials)
+                The preferred phase (in degrees) extracted from the mean of
+                trials of size :
+                (n_amplitude x n_phase x n_electrodes x n_windows)
 
             ambin: array
                 The binarized amplitude of size :
                 (n_amplitude x n_phase x n_electrodes x n_windows x n_bins x n_trials)
 
             pvalue: array
-                The associated p-values of size :
+                The p-values of the Rayleigh test of the preferred phases
+                across trials, of size :
                 (n_amplitude x n_phase x n_electrodes x n_windows)
         """
         # Check the inputs variables :
         xpha, xamp = _cfcCheck(xpha, xamp, self._npts)
-        nelec, npts, ntrials = xamp.shape
-        namp, npha, nwin, nbins = self._nAmp, self._nPha, self._nwin, self._nbins
         phabin, binsize = self._phabin, self._binsize
 
         # Get filtered phase and amplitude ;
@@ -813,49 +909,37 @@ class pfdphase(_coupling):
         # Bring phase from [-pi,pi] to [0, 360]
         pha = np.rad2deg((pha+2*np.pi)%(2*np.pi))
 
-        # Windowing phase an amplitude :
-        pha = [pha[:, :, k[0]:k[1], :] for k in self._window]
-        amp = [amp[:, :, k[0]:k[1], :] for k in self._window]
-
-        # Define iter product :
-        iteract = product(range(namp), range(npha), range(nelec), range(nwin))
-        data = Parallel(n_jobs=n_jobs)(delayed(_pfp)(
-                pha[w][e, p, ...], amp[w][e, a, ...],
-                phabin, binsize) for a, p, e, w in iteract)
-
-        # Manage dim and output :
-        pfp, prf, pval, ampbin = zip(*data)
-        del pha, amp, data
-        ls = [namp, npha, nelec, nwin, nbins, ntrials]
-        ampbin = np.array(ampbin).reshape(*tuple(ls))
-        prf = np.array(prf).reshape(*tuple(ls[0:-2]))
-        pval = np.array(pval).reshape(*tuple(ls[0:-2]))
-        ls.pop(4)
-        pfp = np.array(pfp).reshape(*tuple(ls))
+        # Binarize amplitude of each window (all trials, bands and
+        # electrodes at once) :
+        ampbin = np.array([_pfpbin(pha[:, :, k[0]:k[1], :],
+                                   amp[:, :, k[0]:k[1], :], phabin,
+                                   binsize) for k in self._window])
+        del pha, amp
+        # (nwin, namp, npha, nelec, nbins, ntrials) -> ampbin shape :
+        ampbin = np.moveaxis(ampbin, 0, 3)
+
+        # Find prefered phase and p-values :
+        pfp = phabin[ampbin.argmax(axis=4)]+binsize/2
+        prf = phabin[ampbin.mean(axis=5).argmax(axis=4)]+binsize/2
+        pval = circ_rtest(np.deg2rad(pfp), axis=-1)[0].reshape(prf.shape)
 
         return pfp, prf, ampbin, pval
-        
-def _pfp(pha, amp, phabin, binsize):
+
+
+def _pfpbin(pha, amp, phabin, binsize):
     """Sub prefered phase function
+    [pha] = (nelec, npha, npts, ntrials) in degrees,
+    [amp] = (nelec, namp, npts, ntrials)
+    Return the normalized binarized amplitude of shape
+    (namp, npha, nelec, nbins, ntrials)
     """
-    nbin, nt = len(phabin), pha.shape[1]
-    ampbin = np.zeros((len(phabin), nt), dtype=float)
-    # Binarize amplitude accros all trials :
-    for t in range(nt):
-        curpha, curamp = pha[:, t], amp[:, t]
-        for i, p in enumerate(phabin):
-            idx = np.logical_and(curpha >= p, curpha < p+binsize)
-            if idx.astype(int).sum() != 0:
-                ampbin[i, t] = curamp[idx].mean()
-            else:
-                ampbin[i, t] = 0
-        ampbin[:, t] /= ampbin[:, t].sum()
-    # Find prefered phase and p-values :
-    pfp = np.array([phabin[k]+binsize/2 for k in ampbin.argmax(axis=0)])
-    pvalue = circ_rtest(pfp)[0]
-    prf = phabin[ampbin.mean(axis=1).argmax()]+binsize/2
-    
-    return pfp, prf, pvalue, ampbin
+    # Bin of each phase sample :
+    edges = np.append(phabin, phabin[-1]+binsize)
+    pbin = np.digitize(np.moveaxis(pha, 0, 2), edges) - 1
+    # (namp, npha, nbins, nelec, ntrials) :
+    ampbin = _binMean(pbin, np.moveaxis(amp, 0, 2), len(phabin))
+    ampbin /= ampbin.sum(axis=2, keepdims=True)
+    return np.moveaxis(ampbin, 2, 3)
 
 
 class PLV(_coupling):
@@ -892,6 +976,7 @@ class PLV(_coupling):
     .. rubric:: Footnotes
     .. [#f7] `Lachaux et al, 1999 <http://www.ma.utexas.edu/users/davis/reu/ch3/cwt/lachaux.pdf>`_
     """
+    _cacheattr = _coupling._cacheattr + ['_sample']
 
     def __init__(self, sf, npts, f=[2, 4], method='hilbert', cycle=3,
                  sample=None, time=None, **kwargs):
@@ -917,6 +1002,7 @@ class PLV(_coupling):
         self.time = time[sample]
         del self.amp
 
+    @cached
     def get(self, xelec1, xelec2, n_perm=200, n_jobs=-1):
         """Get Phase-Locking Values for a set of distant sites
 
@@ -958,12 +1044,9 @@ class PLV(_coupling):
         nelec1, npts, ntrials, nelec2, npha = *xelec1.shape, xelec2.shape[0], self._nPha
 
         # Get filtered phase for xelec1 and xelec2 :
-        xcat = np.concatenate((xelec1, xelec2), axis=0)
+        xp1 = _cfcfilt(xelec1, self._pha, n_jobs, self)
+        xp2 = _cfcfilt(xelec2, self._pha, n_jobs, self)
         del xelec1, xelec2
-        data = np.array(Parallel(n_jobs=n_jobs)(delayed(_plvfilt)(
-                    xcat[e, ...], self) for e in range(xcat.shape[0])))
-        xp1, xp2 = data[0:nelec1, ...], data[nelec1::, ...]
-        del data
 
         # Select samples :
         xp1, xp2 = xp1[:, :, self._sample, :], xp2[:, :, self._sample, :]
@@ -985,13 +1068,6 @@ class PLV(_coupling):
 
         return plv, pvalues
     
-def _plvfilt(x, self):
-    """Sub PLV filt
-    """
-    # Get the filter for phase/amplitude properties :
-    fMeth = self._pha.get(self._sf, self._pha.f, self._npts)
-    return self._pha.apply(x, fMeth)
-
 def _plvstat(xp1, xp2, plv, n_perm, n_jobs, perm):
     """Sub plv-stat function
     """
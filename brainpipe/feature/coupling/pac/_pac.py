@@ -1,10 +1,8 @@
 import numpy as np
-from scipy.signal import hilbert
-from itertools import product
 from joblib import Parallel, delayed
 
 from .pacmeth import *
-from brainpipe.tools import groupInList, list2index, adaptsize
+from brainpipe.feature.utils._filtering import _analytic
 
 __all__ = [
             '_cfcCheck',
@@ -12,8 +10,9 @@ __all__ = [
           ]
 
 
-def _cfcFiltSuro(xPha, xAmp, surJob, self):
-    """SUP: Get the cfc and surrogates
+def _cfcFiltSuro(xPha, xAmp, surJob, self, filt=True):
+    """SUP: Get the cfc and surrogates of an electrode. If filt is False,
+    xPha and xAmp are the already filtered phase and amplitude.
 
     The function return:
         - The unormalized cfc
@@ -22,38 +21,28 @@ def _cfcFiltSuro(xPha, xAmp, surJob, self):
         - The deviation of surrogates (for normalization)
     """
     # Check input variables :
-    npts, ntrial = xPha.shape
     W = self._window
-    nwin = len(W)
-
-    # Get the filter for phase/amplitude properties :
-    phaMeth = self._pha.get(self._sf, self._pha.f, self._npts)
-    ampMeth = self._amp.get(self._sf, self._amp.f, self._npts)
 
     # Filt the phase and amplitude :
-    xPha = self._pha.apply(xPha, phaMeth)
-    xAmp = self._amp.apply(xAmp, ampMeth)
+    if filt:
+        xPha = self._pha.apply(xPha, self._pha.get(self._sf, self._pha.f,
+                                                   self._npts))
+        xAmp = self._amp.apply(xAmp, self._amp.get(self._sf, self._amp.f,
+                                                   self._npts))
 
     # Extract phase of amplitude for PLV method:
     if self.Id[0] in ['4']:
-        for a in range(xAmp.shape[0]):
-            for t in range(xAmp.shape[2]):
-                xAmp[a, :, t] = np.angle(hilbert(np.ravel(xAmp[a, :, t])))
-
-    # 2D loop trick :
-    claIdx, listWin, listTrial = list2index(nwin, ntrial)
+        xAmp = np.angle(_analytic(xAmp, axis=1))
 
-    # Get the unormalized cfc :
-    uCfc = [_cfcGet(np.squeeze(xPha[:, W[k[0]][0]:W[k[0]][1], k[1]]),
-                    np.squeeze(xAmp[:, W[k[0]][0]:W[k[0]][1], k[1]]),
-                    self.Id, self._nbins) for k in claIdx]
-    uCfc = np.array(groupInList(uCfc, listWin))
+    # Get the unormalized cfc (all trials of a window at once) :
+    uCfc = _cfcGet(xPha, xAmp, W, self.Id, self._nbins)
 
     # Run surogates on each window :
     if (self.n_perm != 0) and (self.Id[0] is not '5') and (self.Id[1] is not '0'):
         Suro = Parallel(n_jobs=surJob)(delayed(_cfcGetSuro)(
             xPha[:, k[0]:k[1], :], xAmp[:, k[0]:k[1], :],
-            self.Id, self.n_perm, self._nbins, self._matricial) for k in self._window)
+            self.Id, self.n_perm, self._nbins, self._matricial,
+            self._tlag) for k in self._window)
         mSuro = [np.mean(k, 3) for k in Suro]
         stdSuro = [np.std(k, 3) for k in Suro]
     else:
@@ -62,20 +51,26 @@ def _cfcFiltSuro(xPha, xAmp, surJob, self):
     return uCfc, Suro, mSuro, stdSuro
 
 
-def _cfcGet(pha, amp, Id, nbins):
-    """Compute the basic cfc model
+def _cfcGet(pha, amp, W, Id, nbins):
+    """Compute the basic cfc model in each window
+
+    [pha] = (nPha, npts, ntrials), [amp] = (nAmp, npts, ntrials)
+    Return a (nwin, ntrials, nAmp, nPha) array.
     """
     # Get the cfc model :
     Model, _, _, _, _, _ = CfcSettings(Id, nbins=nbins)
 
-    return Model(np.matrix(pha), np.matrix(amp), nbins)
+    return np.array([np.moveaxis(Model(pha[:, k[0]:k[1], :],
+                                       amp[:, k[0]:k[1], :], nbins), 2, 0)
+                     for k in W])
 
 
-def _cfcGetSuro(pha, amp, Id, n_perm, nbins, matricial):
+def _cfcGetSuro(pha, amp, Id, n_perm, nbins, matricial, tlag=None):
     """Compute the basic cfc model
     """
     # Get the cfc model :
-    Model, Sur, _, _, _, _ = CfcSettings(Id, nbins=nbins, matricial=matricial)
+    Model, Sur, _, _, _, _ = CfcSettings(Id, nbins=nbins, tlag=tlag,
+                                         matricial=matricial)
 
     return Sur(pha, amp, Model, n_perm, matricial)
 
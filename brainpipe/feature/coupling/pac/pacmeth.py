@@ -1,9 +1,11 @@
 import numpy as np
 from scipy.special import erfinv
-from itertools import product
 
 from brainpipe.tools import binarize
-from brainpipe.statistics import perm_swap, perm_array
+from brainpipe.statistics import perm_swapidx
+
+# Memory budget (in bytes) of a block of surrogates :
+_SUROMEMORY = 256 * 2**20
 
 __all__ = [
     'CfcSettings',
@@ -13,7 +15,7 @@ __all__ = [
 # ----------------------------------------------------------------------------
 #                            ID to CFC MODEL
 # ----------------------------------------------------------------------------
-def CfcSettings(Id, nbins=18, n_perm=200, tlag=[0, 0], matricial=True):
+def CfcSettings(Id, nbins=18, n_perm=200, tlag=None, matricial=True):
     """From an Id, get the model of cfc composed with:
     - Method : how to compute cfc
     - Surrogates : method for computing surrogates
@@ -53,14 +55,20 @@ def CfcMethodList(Id, nbins=18):
 
     Each method take at least a pha and amp array with the respective
     dimensions:
-    pha.shape = (Nb phase     x Time points)
-    amp.shape = (Nb amplitude x Time points)
-    And each method should return a (Nb amplitude x Nb phase)
+    pha.shape = (Nb phase     x Time points x ...)
+    amp.shape = (Nb amplitude x Time points x ...)
+    And each method should return a (Nb amplitude x Nb phase x ...) array.
+    The trailing dimensions (e.g. trials) are computed at once.
+
+    Methods with a 'fftlag' attribute also accept lagged=True. In that
+    case, they return the cfc for every circular lag of the amplitude with
+    a (Nb amplitude x Nb phase x Time points x ...) shape.
     """
     # Mean Vector Length (Canolty, 2006)
     if Id == 1:
-        def CfcModel(pha, amp, *arg):
-            return MVL(pha, amp)
+        def CfcModel(pha, amp, *arg, lagged=False):
+            return MVL(pha, amp, lagged=lagged)
+        CfcModel.fftlag = True
         CfcModelStr = 'Mean Vector Length (Canolty, 2006)'
 
     # Kullback-Leiber divergence (Tort, 2010)
@@ -78,27 +86,56 @@ def CfcMethodList(Id, nbins=18):
 
     # Phase synchrony
     elif Id == 4:
-        def CfcModel(pha, amp, *arg):
-            return PhaseSynchrony(pha, amp)
+        def CfcModel(pha, amp, *arg, lagged=False):
+            return PhaseSynchrony(pha, amp, lagged=lagged)
+        CfcModel.fftlag = True
         CfcModelStr = 'Phase synchrony (PLV, (Penny, 2008))'
 
     # ndPac (Ozkurt, 2012)
     elif Id == 5:
-        def CfcModel(pha, amp, *arg):
-            return ndCfc(pha, amp)
+        def CfcModel(pha, amp, *arg, lagged=False):
+            return ndCfc(pha, amp, lagged=lagged)
+        CfcModel.fftlag = True
         CfcModelStr = 'Normalized direct Pac (Ozkurt, 2012)'
 
     return CfcModel, CfcModelStr
 
 
-def MVL(pha, amp):
+def _cfcArrays(pha, amp):
+    """Get pha and amp as (Nb bands x Time points x ...) arrays
+    """
+    return np.atleast_2d(np.asarray(pha)), np.atleast_2d(np.asarray(amp))
+
+
+def _tdot(amp, pha, lagged=False):
+    """Sum across time of amp x pha for each couple of amplitude and phase
+
+    [amp] = (nAmp, npts, ...), [pha] = (nPha, npts, ...)
+    Return a (nAmp, nPha, ...) array (batched matrix product). If lagged is
+    True, return the sums for every circular lag s of the amplitude
+    (amp[t-s] x pha[t]) with a (nAmp, nPha, npts, ...) shape. The lags are
+    obtained with a FFT cross-correlation.
+    """
+    if lagged:
+        # Cross-spectrum between the amplitude and the phase :
+        A = np.conj(np.fft.fft(np.conj(amp), axis=1))
+        P = np.fft.fft(pha, axis=1)
+        return np.fft.ifft(A[:, np.newaxis, ...] * P[np.newaxis, ...],
+                           axis=2)
+    amp = np.moveaxis(amp, (0, 1), (-2, -1))
+    pha = np.moveaxis(pha, (0, 1), (-1, -2))
+    return np.moveaxis(np.matmul(amp, pha), (-2, -1), (0, 1))
+
+
+def MVL(pha, amp, lagged=False):
     """Mean Vector Length (Canolty, 2006)
 
     Method :
     abs(amplitude x exp(phase)) <-> sum modulations of the
     complex radius accross time. MI = resultant radius
     """
-    return np.array(abs(amp*np.exp(1j*pha).T)/pha.shape[1])
+    pha, amp = _cfcArrays(pha, amp)
+    return np.abs(_tdot(amp, np.exp(1j*pha), lagged))/pha.shape[1]
 
 
 def KullbackLeiblerDivergence(pha, amp, nbins):
@@ -106,7 +143,7 @@ def KullbackLeiblerDivergence(pha, amp, nbins):
     """
     # Get the phase locked binarized amplitude :
     abin, abinsum = _kl_hr(pha, amp, nbins)
-    abin = np.divide(abin, np.rollaxis(abinsum, 0, start=3))
+    abin = np.divide(abin, abinsum)
     abin[abin == 0] = 1
     abin = abin * np.log2(abin)
 
@@ -126,54 +163,80 @@ def HeightsRatio(pha, amp, nbins):
 
 
 def _kl_hr(pha, amp, nbins):
-    nPha, npts, nAmp = *pha.shape, amp.shape[0]
+    """Mean amplitude in each phase bin
+
+    Return abin (nAmp, nPha, nbins, ...) and its sum across bins.
+    """
+    pha, amp = _cfcArrays(pha, amp)
     step = 2*np.pi/nbins
-    vecbin = binarize(-np.pi, np.pi+step, step, step)
+    vecbin = np.array(binarize(-np.pi, np.pi+step, step, step))
     if len(vecbin) > nbins:
         vecbin = vecbin[0:-1]
+    edges = np.append(vecbin[:, 0], vecbin[-1, 1])
 
-    abin = np.zeros((nAmp, nPha, nbins))
-    for k, i in enumerate(vecbin):
-        # Find where phase take vecbin values :
-        pL, pC = np.where((pha >= i[0]) & (pha < i[1]))
-
-        # Matrix to do amp x binMat :
-        binMat = np.zeros((npts, nPha))
-        binMat[pC, pL] = 1
-        meanMat = np.matlib.repmat(binMat.sum(axis=0), nAmp, 1)
-        meanMat[meanMat == 0] = 1
-
-        # Multiply matrix :
-        abin[:, :, k] = np.divide(np.dot(amp, binMat), meanMat)
-    abinsum = np.array([abin.sum(axis=2) for k in range(nbins)])
+    abin = _binMean(np.digitize(pha, edges) - 1, amp, nbins)
+    abinsum = abin.sum(axis=2, keepdims=True)
 
     return abin, abinsum
 
 
-def PhaseSynchrony(pha, amp):
+def _binMean(pbin, amp, nbins):
+    """Mean amplitude in each phase bin (grouped sums with bincount)
+
+    [pbin] = (nPha, npts, ...) bin of each phase sample (samples outside
+    [0, nbins[ are ignored), [amp] = (nAmp, npts, ...)
+    Return a (nAmp, nPha, nbins, ...) array (0 for empty bins).
+    """
+    nPha, npts, nAmp = *pbin.shape[0:2], amp.shape[0]
+    bsh = np.broadcast_shapes(pbin.shape[2:], amp.shape[2:])
+    nB = int(np.prod(bsh))
+    pbin = np.broadcast_to(pbin, (nPha, npts) + bsh).reshape(nPha, npts, nB)
+    # Group of each (phase, trial, bin), phase outside bins in a last group :
+    ngroup = nPha * nB * nbins
+    group = (np.arange(nPha)[:, np.newaxis, np.newaxis] * nB +
+             np.arange(nB)[np.newaxis, np.newaxis, :]) * nbins + pbin
+    group[(pbin < 0) | (pbin >= nbins)] = ngroup
+    group = group.ravel()
+
+    # Number of samples and sum of amplitude in each group :
+    count = np.bincount(group, minlength=ngroup+1)[0:ngroup]
+    count[count == 0] = 1
+    amp = np.broadcast_to(amp, (nAmp, npts) + bsh).reshape(nAmp, 1, npts, nB)
+    amp = np.broadcast_to(amp, (nAmp, nPha, npts, nB))
+    abin = np.zeros((nAmp, ngroup))
+    for a in range(nAmp):
+        abin[a, :] = np.bincount(group, weights=amp[a, ...].ravel(),
+                                 minlength=ngroup+1)[0:ngroup] / count
+    abin = np.moveaxis(abin.reshape(nAmp, nPha, nB, nbins), 3, 2)
+
+    return abin.reshape((nAmp, nPha, nbins) + bsh)
+
+
+def PhaseSynchrony(pha, amp, lagged=False):
     """Phase Synchrony
     """
-    return np.array(abs((np.exp(-1j*amp)*(np.exp(1j*pha).T))/pha.shape[1]))
+    pha, amp = _cfcArrays(pha, amp)
+    return np.abs(_tdot(np.exp(-1j*amp), np.exp(1j*pha),
+                        lagged))/pha.shape[1]
 
 
-def ndCfc(pha, amp):
+def ndCfc(pha, amp, lagged=False):
     """Normalized direct Pac (Ozkurt, 2012)
     """
+    pha, amp = _cfcArrays(pha, amp)
     npts = amp.shape[1]
-    # Get mean and deviation of amplitude :
-    amp_m = np.tile(np.mean(amp, 1)[..., np.newaxis], (1, npts))
-    amp_std = np.tile(np.std(amp, 1)[..., np.newaxis], (1, npts))
     # Normalize amplitude :
-    amp = np.divide(amp - amp_m, amp_std)
+    amp = np.divide(amp - amp.mean(axis=1, keepdims=True),
+                    amp.std(axis=1, keepdims=True))
     # Compute pac :
-    return np.square(np.abs(amp*np.exp(1j*pha.T)))/npts
+    return np.square(np.abs(_tdot(amp, np.exp(1j*pha), lagged)))/npts
 
 # ----------------------------------------------------------------------------
 #                                 SURROGATES
 # ----------------------------------------------------------------------------
 
 
-def CfcSurrogatesList(Id, CfcModel, n_perm=200, tlag=[0, 0], matricial=True):
+def CfcSurrogatesList(Id, CfcModel, n_perm=200, tlag=None, matricial=True):
     """List of methods to compute surrogates.
 
     The surrogates are used to normalized the cfc value. It help to determine
@@ -185,8 +248,11 @@ def CfcSurrogatesList(Id, CfcModel, n_perm=200, tlag=[0, 0], matricial=True):
     - Swap amplitude
     - Shuffle phase time-series
     - Shuffle amplitude time-series
-    - Time lag
-    - circular shifting
+    - Time lag : the same random circular lag (between tlag[0] and tlag[1]
+      samples, every lag by default) is applied to the amplitude of all
+      trials
+    - circular shifting : the amplitude of each trial is circularly shifted
+      by an independent random lag
 
     Each method should return the surrogates, the mean of the surrogates and
     the deviation of the surrogates.
@@ -213,27 +279,34 @@ def CfcSurrogatesList(Id, CfcModel, n_perm=200, tlag=[0, 0], matricial=True):
 
     # Shuffle phase values
     elif Id == 3:
-        def CfcSuroModel(pha, amp, CfcModel, n_perm, *args):
-            return CfcShufflePhase(pha, amp, CfcModel, n_perm=n_perm)
+        def CfcSuroModel(pha, amp, CfcModel, n_perm, matricial, *args):
+            return CfcShufflePhase(pha, amp, CfcModel, n_perm=n_perm,
+                                   matricial=matricial)
         CfcSuroModelStr = 'Shuffle phase time-series'
 
     # Shuffle amplitude values
     elif Id == 4:
-        def CfcSuroModel(pha, amp, CfcModel, n_perm, *args):
-            return CfcShuffleAmp(pha, amp, CfcModel, n_perm=n_perm)
+        def CfcSuroModel(pha, amp, CfcModel, n_perm, matricial, *args):
+            return CfcShuffleAmp(pha, amp, CfcModel, n_perm=n_perm,
+                                 matricial=matricial)
         CfcSuroModelStr = 'Shuffle amplitude time-series'
 
     # Introduce a time lag
     elif Id == 5:
-        def CfcSuroModel(pha, amp, CfcModel, n_perm, tlag, *args):
-            return CfcTimeLag(pha, amp, CfcModel, n_perm=n_perm, tlag=tlag)
-        CfcSuroModelStr = 'Time lag on amplitude between ['+int(
-            tlag[0])+';'+int(tlag[1])+'] , (Canolty, 2006)'
+        def CfcSuroModel(pha, amp, CfcModel, n_perm, matricial, *args):
+            return CfcTimeLag(pha, amp, CfcModel, n_perm=n_perm, tlag=tlag,
+                              matricial=matricial)
+        if tlag is None:
+            CfcSuroModelStr = 'Time lag on amplitude, (Canolty, 2006)'
+        else:
+            CfcSuroModelStr = 'Time lag on amplitude between ['+str(int(
+                tlag[0]))+';'+str(int(tlag[1]))+'], (Canolty, 2006)'
 
     # Circular shifting
     elif Id == 6:
-        def CfcSuroModel(pha, amp, CfcModel, n_perm):
-            return CfcCircShift(pha, amp, CfcModel, n_perm=n_perm)
+        def CfcSuroModel(pha, amp, CfcModel, n_perm, matricial, *args):
+            return CfcCircShift(pha, amp, CfcModel, n_perm=n_perm,
+                                matricial=matricial)
         CfcSuroModelStr = 'Circular shifting'
 
     return CfcSuroModel, CfcSuroModelStr
@@ -245,37 +318,11 @@ def CfcTrialSwap(xfP, xfA, CfcModel, n_perm=200, matricial=True):
     [xfP] = (nPha, npts, ntrials)
     [xfA] = (nAmp, npts, ntrials)
     """
-    # Get sizes :
-    nPha, timeL, nbTrials = xfP.shape
-    nAmp = xfA.shape[0]
-    Suro = np.zeros((nbTrials, nAmp, nPha, n_perm))
-    if matricial:
-        # Swap trials phase/amplitude :
-        phamp = np.concatenate((xfP, xfA))
-        phampSh1, phampSh2 = perm_swap(phamp, phamp, axis=2, n_perm=n_perm)
-        phaSh, ampSh = phampSh1[:, 0:nPha, ...], phampSh2[:, nPha::, ...]
-        del phamp, phampSh1, phampSh2
-        # Get pac :
-        iteract = product(range(nbTrials), range(n_perm))
-        for tr, pe in iteract:
-            Suro[tr, :, :, pe] = CfcModel(np.matrix(phaSh[pe, :, :, tr]),
-                                          ampSh[pe, :, :, tr])
-    else:
-        # Swap trials phase/amplitude :
-        phampiter = product(range(nPha), range(nAmp))
-        for ipha, iamp in phampiter:
-            # Concatenate selected pha/amp :
-            phamp = np.concatenate((xfP[[ipha], ...], xfA[[iamp], ...]))
-            # Swap:
-            phampSh1, phampSh2 = perm_swap(phamp, phamp, axis=2, n_perm=n_perm)
-            phaSh, ampSh = phampSh1[:, 0, ...], phampSh2[:, 1, ...]
-            # Get pac :
-            iteract = product(range(nbTrials), range(n_perm))
-            for tr, pe in iteract:
-                Suro[tr, iamp, ipha, pe] = CfcModel(np.matrix(phaSh[pe, :, tr]),
-                                                    ampSh[pe, :, tr])
-
-    return Suro
+    # Swap trials phase/amplitude (same permutations as perm_swap) :
+    nbTrials = xfP.shape[2]
+    idx = perm_swapidx(2*nbTrials, n_perm) % nbTrials
+    return _cfcSuro(xfP, xfA, CfcModel, n_perm, idx[:, 0:nbTrials],
+                    idx[:, nbTrials::], 2, matricial)
 
 
 def CfcAmpSwap(xfP, xfA, CfcModel, n_perm=200, matricial=True):
@@ -284,99 +331,160 @@ def CfcAmpSwap(xfP, xfA, CfcModel, n_perm=200, matricial=True):
     [xfP] = (nPha, npts, ntrials)
     [xfA] = (nAmp, npts, ntrials)
     """
-    # Get sizes :
-    nPha, timeL, nbTrials = xfP.shape
-    nAmp = xfA.shape[0]
-    Suro = np.zeros((nbTrials, nAmp, nPha, n_perm))
-    if matricial:
-        # Swap trials phase/amplitude :
-        ampSh, _ = perm_swap(xfA, xfA, axis=2, n_perm=n_perm)
-        # Get pac :
-        iteract = product(range(nbTrials), range(n_perm))
-        for tr, pe in iteract:
-            Suro[tr, :, :, pe] = CfcModel(xfP[:, :, tr],
-                                          np.matrix(ampSh[pe, :, :, tr]))
-    else:
-        for iamp in range(nAmp):
-            ampSh, _ = perm_swap(xfA[iamp, ...], xfA[iamp, ...], axis=1, n_perm=n_perm)
-            # Get pac :
-            iteract = product(range(nbTrials), range(n_perm))
-            for tr, pe in iteract:
-                Suro[tr, iamp, :, pe] = CfcModel(xfP[:, :, tr],
-                                                 np.matrix(ampSh[pe, :, tr]))
-
-    return Suro
+    # Swap trials amplitude (same permutations as perm_swap) :
+    nbTrials = xfP.shape[2]
+    idx = perm_swapidx(2*nbTrials, n_perm) % nbTrials
+    return _cfcSuro(xfP, xfA, CfcModel, n_perm, None, idx[:, 0:nbTrials],
+                    2, matricial)
 
 
-def CfcShufflePhase(xfP, xfA, CfcModel, n_perm=200):
+def CfcShufflePhase(xfP, xfA, CfcModel, n_perm=200, matricial=True):
     """Randomly shuffle phase
 
     [xfP] = (nPha, npts, ntrials)
     [xfA] = (nAmp, npts, ntrials)
     """
-    # Get sizes :
-    nPha, timeL, nbTrials = xfP.shape
-    nAmp = xfA.shape[0]
-    perm = [np.random.permutation(timeL) for k in range(n_perm)]
-    # Compute surrogates :
-    Suro = np.zeros((nbTrials, nAmp, nPha, n_perm))
-    for k in range(nbTrials):
-        curPha, curAmp = xfP[:, :, k], np.matrix(xfA[:, :, k])
-        for i in range(n_perm):
-            # Randomly permute phase time-series :
-            CurPhaShuffle = curPha[:, perm[i]]
-            # compute new Cfc :
-            Suro[k, :, :, i] = CfcModel(np.matrix(CurPhaShuffle), curAmp)
+    timeL = xfP.shape[1]
+    perm = np.array([np.random.permutation(timeL) for k in range(n_perm)])
+    return _cfcSuro(xfP, xfA, CfcModel, n_perm, perm, None, 1, matricial)
 
-    return Suro
 
+def CfcShuffleAmp(xfP, xfA, CfcModel, n_perm=200, matricial=True):
+    """Randomly shuffle amplitudes
+
+    [xfP] = (nPha, npts, ntrials)
+    [xfA] = (nAmp, npts, ntrials)
+    """
+    timeL = xfP.shape[1]
+    perm = np.array([np.random.permutation(timeL) for k in range(n_perm)])
+    return _cfcSuro(xfP, xfA, CfcModel, n_perm, None, perm, 1, matricial)
 
-def CfcShuffleAmp(xfP, xfA, CfcModel, n_perm=200):
+
+def CfcShufflePhaAmp(xfP, xfA, CfcModel, n_perm=200, matricial=True):
     """Randomly shuffle amplitudes
 
     [xfP] = (nPha, npts, ntrials)
     [xfA] = (nAmp, npts, ntrials)
     """
-    # Get sizes :
-    nPha, timeL, nbTrials = xfP.shape
+    timeL = xfP.shape[1]
+    perm = np.array([np.random.permutation(timeL) for k in range(n_perm)])
+    return _cfcSuro(xfP, xfA, CfcModel, n_perm, perm, perm, 1, matricial)
+
+
+def CfcTimeLag(xfP, xfA, CfcModel, n_perm=200, tlag=None, matricial=True):
+    """Introduce a random time lag on the amplitude (Canolty, 2006)
+
+    For each surrogate, the amplitude of all the trials is circularly lagged
+    by the same random lag, drawn between tlag[0] and tlag[1] (in samples).
+    If tlag is None, the lag is drawn between 1 and npts-1.
+
+    [xfP] = (nPha, npts, ntrials)
+    [xfA] = (nAmp, npts, ntrials)
+    """
+    timeL, nbTrials = xfP.shape[1::]
+    if tlag is None:
+        tlag = [1, timeL-1]
+    if not (0 <= tlag[0] <= tlag[1] < timeL):
+        raise ValueError("tlag must be an increasing couple of lags between 0"
+                         " and "+str(timeL-1)+" samples")
+    lags = np.random.randint(tlag[0], tlag[1]+1, size=(n_perm, 1))
+    return _cfcLagSuro(xfP, xfA, CfcModel, n_perm,
+                       np.repeat(lags, nbTrials, axis=1), matricial)
+
+
+def CfcCircShift(xfP, xfA, CfcModel, n_perm=200, matricial=True):
+    """Circularly shift the amplitude of each trial by a random lag
+
+    [xfP] = (nPha, npts, ntrials)
+    [xfA] = (nAmp, npts, ntrials)
+    """
+    timeL, nbTrials = xfP.shape[1::]
+    lags = np.random.randint(1, timeL, size=(n_perm, nbTrials))
+    return _cfcLagSuro(xfP, xfA, CfcModel, n_perm, lags, matricial)
+
+
+def _cfcLagSuro(xfP, xfA, CfcModel, n_perm, lags, matricial):
+    """Surrogates of circularly lagged amplitudes
+
+    lags is an (n_perm, ntrials) array of lags. For the methods that
+    support it (MVL, phase synchrony and ndPAC), the cfc of every lag is
+    computed with one FFT cross-correlation per trial. Then, surrogates are
+    picked from it. Otherwise, the lagged amplitudes are computed by blocks.
+
+    Return the surrogates of shape (ntrials, nAmp, nPha, n_perm)
+    """
+    if not getattr(CfcModel, 'fftlag', False):
+        return _cfcSuro(xfP, xfA, CfcModel, n_perm, None, lags, -1,
+                        matricial)
+    nPha, npts, nbTrials = xfP.shape
     nAmp = xfA.shape[0]
-    perm = [np.random.permutation(timeL) for k in range(n_perm)]
-    # Compute surrogates :
     Suro = np.zeros((nbTrials, nAmp, nPha, n_perm))
-    for k in range(nbTrials):
-        curPha, curAmp = xfP[:, :, k], np.matrix(xfA[:, :, k])
-        for i in range(n_perm):
-            # Randomly permute amplitude time-series :
-            CurAmpShuffle = curAmp[:, perm[i]]
-            # compute new Cfc :
-            Suro[k, :, :, i] = CfcModel(np.matrix(curPha), CurAmpShuffle)
+    # Number of trials at once (complex cross-spectrum of a trial) :
+    if matricial:
+        tsize = nbTrials
+    else:
+        tsize = _SUROMEMORY // (32 * nAmp * nPha * npts)
+    tsize = int(max(1, min(tsize, nbTrials)))
+    for k in range(0, nbTrials, tsize):
+        tr = np.arange(k, min(k + tsize, nbTrials))
+        # Cfc of every lags (nAmp, nPha, npts, ntr) :
+        xlag = CfcModel(xfP[..., tr], xfA[..., tr], lagged=True)
+        # (nAmp, nPha, n_perm, ntr) -> (ntr, nAmp, nPha, n_perm) :
+        Suro[tr, ...] = np.moveaxis(xlag[:, :, lags[:, tr], tr - k],
+                                    (2, 3), (3, 0))
 
     return Suro
 
 
-def CfcShufflePhaAmp(xfP, xfA, CfcModel, n_perm=200):
-    """Randomly shuffle amplitudes
+def _cfcSuro(xfP, xfA, CfcModel, n_perm, phaIdx, ampIdx, axis, matricial):
+    """Compute surrogates by blocks of permutations
 
-    [xfP] = (nPha, npts, ntrials)
-    [xfA] = (nAmp, npts, ntrials)
+    The permutation k takes phaIdx[k] (resp. ampIdx[k]) along the axis of
+    xfP (resp. xfA). This axis is either 1 (time) or 2 (trials). If axis is
+    -1, indices are (n_perm, ntrials) circular lags of each trial. If an
+    index is None, the signal is not permuted. The permutations of a block are
+    computed at once by the batched CfcModel. If matricial is True, all the
+    permutations are in a single block. Otherwise, the size of a block is
+    defined by the memory budget _SUROMEMORY.
+
+    Return the surrogates of shape (ntrials, nAmp, nPha, n_perm)
     """
-    # Get sizes :
-    nPha, timeL, nbTrials = xfP.shape
+    nPha, npts, nbTrials = xfP.shape
     nAmp = xfA.shape[0]
-    perm = [np.random.permutation(timeL) for k in range(n_perm)]
-    # Compute surrogates :
     Suro = np.zeros((nbTrials, nAmp, nPha, n_perm))
-    for k in range(nbTrials):
-        curPha, curAmp = xfP[:, :, k], np.matrix(xfA[:, :, k])
-        for i in range(n_perm):
-            # Randomly permute phase time-series :
-            CurAmpShuffle = curAmp[:, perm[i]]
-            CurPhaShuffle = curPha[:, perm[i]]
-            # compute new Cfc :
-            Suro[k, :, :, i] = CfcModel(np.matrix(CurPhaShuffle), CurAmpShuffle)
+    # Size of a block (copies and complex temporaries of a permutation) :
+    if matricial:
+        bsize = n_perm
+    else:
+        bsize = _SUROMEMORY // (32 * (nPha + nAmp) * npts * nbTrials)
+    bsize = int(max(1, min(bsize, n_perm)))
+    for k in range(0, n_perm, bsize):
+        blk = slice(k, min(k + bsize, n_perm))
+        pha = _suroTake(xfP, phaIdx, blk, axis)
+        amp = _suroTake(xfA, ampIdx, blk, axis)
+        # (nAmp, nPha, nblk, ntrials) -> (ntrials, nAmp, nPha, nblk) :
+        Suro[..., blk] = np.moveaxis(CfcModel(pha, amp), (2, 3), (3, 0))
 
     return Suro
 
+
+def _suroTake(x, idx, blk, axis):
+    """Permuted copies of x of shape (nBands, npts, nblk, ntrials)
+    """
+    if idx is None:
+        # Broadcasted by the model :
+        return x[:, :, np.newaxis, :]
+    elif axis == 2:
+        return x[:, :, idx[blk]]
+    elif axis == 1:
+        return np.moveaxis(x[:, idx[blk], :], 1, 2)
+    elif axis == -1:
+        npts, nbTrials = x.shape[1::]
+        # Lagged time index of each (permutation, trial) :
+        t = np.arange(npts)[np.newaxis, :, np.newaxis]
+        t = (t - idx[blk][:, np.newaxis, :]) % npts
+        return np.moveaxis(x[:, t, np.arange(nbTrials)], 1, 2)
+
 # ----------------------------------------------------------------------------
 #                               NORMALIZATION
 # ----------------------------------------------------------------------------
@@ -403,7 +511,7 @@ def CfcNormalizationList(Id):
     # Substraction
     if Id == 1:
         def CfcNormModel(uCfc, SuroMean, SuroStd):
-            return ucfc-SuroMean
+            return uCfc-SuroMean
         CfcNormModelStr = 'Substract the mean of surrogates'
 
     # Divide
@@ -4,12 +4,17 @@ Design a filter, filt a signal, extract the phase, amplitude or power
 
 import numpy as np
 
-from .utils._filtering import _get_method, _apply_method
+from .utils._filtering import (_get_method, _apply_method, _split_method,
+                               _filtcache_info, _filtcache_clear, _streamDesign, _streamInit,
+                               _streamApply, _getKind)
 from .utils._feat import _checkref
 
 __all__ = [
     'fdesign',
-    'fextract'
+    'fextract',
+    'fstream',
+    'filtcache_info',
+    'filtcache_clear'
 ]
 
 docfilter = """
@@ -68,8 +73,20 @@ class fextract(fdesign):
                 - 'hilbert': apply a hilbert transform to each column
                 - 'hilbert1': hilbert transform to a whole matrix
                 - 'hilbert2': 2D hilbert transform
-                - 'wavelet': wavelet transform
+                - 'wavelet': complex Morlet wavelet transform. All the
+                  frequencies and trials are convolved in a single batched
+                  FFT convolution. With kind='signal', the modulus of the
+                  wavelet coefficients is returned
                 - 'filter': filtered signal
+                - 'fft': frequency-domain filter-bank. The FFT of the
+                  signal is computed once and all the bands are extracted
+                  in a single batched inverse FFT
+                - 'multitaper': multitaper estimation with DPSS tapers
+                  modulated at the center of each band. The tapers last
+                  'cycle' cycles of the lowest frequency of the band. All
+                  tapers and trials are convolved in a single batched FFT.
+                  The amplitude is the square root of the taper averaged
+                  power and the phase is the one of the first taper
 
         kind: string
             Type of information to extract to the transformed signal.
@@ -78,6 +95,8 @@ class fextract(fdesign):
                 - 'phase': phase of the the transform signal
                 - 'amplitude': amplitude of the transform signal
                 - 'power': power of the transform signal
+                - 'analytic': complex analytic signal (the output has a
+                  complex dtype). Every other kind can be derived from it
 
     Kargs:
         dtrd: bool, optional [def: False]
@@ -88,20 +107,33 @@ class fextract(fdesign):
 
         wltCorr: int, optional [def: 3]
             Correction of the edgde effect for the wavelet
+
+        dtype: numpy type, optional [def: np.float64]
+            Precision of the extracted informations. Use np.float32 to
+            divide the memory usage by two (the FFT are then computed in
+            complex64)
     """
     __doc__ += docfilter
+    # Parameters of the extraction (cache key) :
+    _cacheattr = ['f', '_method', '_kind', '_wltWidth', '_wltCorr', '_dtrd',
+                  '_dtype', '_filtname', '_cycle', '_order', '_axis']
 
     def __init__(self, method, kind, filtname='fir1', cycle=3, order=3,
-                 axis=0, dtrd=False, wltWidth=7, wltCorr=3):
+                 axis=0, dtrd=False, wltWidth=7, wltCorr=3,
+                 dtype=np.float64):
         # Check the defined method :
         _checkref('method', method, ['hilbert', 'hilbert1', 'hilbert2',
-                  'wavelet', 'filter'])
-        _checkref('kind', kind, ['signal', 'phase', 'amplitude', 'power'])
+                  'wavelet', 'filter', 'fft', 'multitaper'])
+        _checkref('kind', kind, ['signal', 'phase', 'amplitude', 'power',
+                                 'analytic'])
         self._method = method
         self._kind = kind
         self._wltWidth = wltWidth
         self._wltCorr = wltCorr
         self._dtrd = dtrd
+        self._dtype = np.dtype(dtype)
+        if kind == 'analytic':
+            self._dtype = np.result_type(self._dtype, np.complex64)
         super().__init__(filtname=filtname, cycle=cycle, order=order,
                          axis=axis)
 
@@ -129,7 +161,10 @@ class fextract(fdesign):
 
         Return:
             fMeth: list
-                List of methods for filtering
+                List of methods for filtering (one per frequency band). For
+                the filter-bank methods ('hilbert', 'fft', 'wavelet' and
+                'multitaper'), fMeth.bank is a method which transforms all
+                the bands at once (used by apply).
         """
         if type(f[0]) == int:
             f = [f]
@@ -152,4 +187,173 @@ class fextract(fdesign):
                 The filtered signal of shape (n frequency x npts x ntrials)
         """
         return _apply_method(x, fMeth, self._dtrd, self._method,
-                             self._wltCorr, self._wltWidth)
+                             self._wltCorr, self._wltWidth, self._dtype)
+
+    def iterapply(self, x, fMeth, index):
+        """Apply the defined methods, group of bands per group of bands
+
+        Args:
+            x: array
+                Array to filt. Shape of x must be (npts x ntrials)
+
+            fMeth: list
+                List of methods for filtering
+
+            index: list
+                List of (i0, i1) couples, the indices of each group of bands
+
+        Return:
+            A generator of (i0, i1, xf) where xf is the filtered signal of the
+            bands i0:i1. For the filter-bank methods, the forward transform of
+            x is shared by all the groups and each xf is the same as
+            apply(x, fMeth)[i0:i1, ...].
+        """
+        return _split_method(x, fMeth, index, self._dtrd, self._method,
+                             self._wltCorr, self._wltWidth, self._dtype)
+
+    def stream(self, sf, f, nchan=1):
+        """Get a streaming extractor, for continuous recordings
+
+        Args:
+            sf: integer
+                Sampling frequency
+
+            f: tuple/list
+                List containing the couple of frequency bands. Each couple can be
+                either a list or a tuple. Example: f=[ [2,4], [5,7], [60,250] ]
+
+        Kargs:
+            nchan: int, optional, [def: 1]
+                Number of channels of the stream
+
+        Return:
+            fs: fstream
+                The streaming extractor. Use fs.push(x) for each incoming
+                block of data.
+
+        Only the filter-based methods ('hilbert', 'hilbert1' and 'hilbert2')
+        can be streamed. A ValueError is raised for the other methods.
+        """
+        _checkref('stream method', self._method, ['hilbert', 'hilbert1',
+                  'hilbert2'])
+        return fstream(sf, f, self._kind, nchan=nchan, filtname=self._filtname,
+                       cycle=self._cycle, order=self._order, dtype=self._dtype)
+
+
+class fstream(object):
+
+    """Extract informations from a continuous stream, block per block
+
+    Contrary to fextract, the filters are causal. Each band is filtered with
+    the designed filter and the analytic signal is obtained with a FIR
+    Hilbert transformer (the real part is delayed accordingly). The states
+    of the filters are kept between successive blocks, so that the output
+    is the same as the one of the whole recording, with a constant memory.
+
+    Args:
+        sf: integer
+            Sampling frequency
+
+        f: tuple/list
+            List containing the couple of frequency bands.
+
+        kind: string
+            Type of information to extract ('signal', 'phase', 'amplitude',
+            'power' or 'analytic')
+
+    Kargs:
+        nchan: int, optional, [def: 1]
+            Number of channels of the stream
+
+        dtype: numpy type, optional [def: np.float64]
+            Precision of the extracted informations
+    """
+    __doc__ += docfilter.replace("""
+        axis: int, optional [def: 0]
+            Filter accross the dimension 'axis'
+""", '')
+    __doc__ += """
+    Attributes:
+        latency: array
+            Latency of each band (in samples). The output at time t
+            describes the signal at time t - latency.
+    """
+
+    def __init__(self, sf, f, kind, nchan=1, filtname='fir1', cycle=3,
+                 order=3, dtype=np.float64):
+        _checkref('kind', kind, ['signal', 'phase', 'amplitude', 'power',
+                                 'analytic'])
+        _checkref('filtname', filtname, ['fir1', 'butter', 'bessel'])
+        if isinstance(f[0], (int, float)):
+            f = [f]
+        self.f = f
+        self._sf, self._kind, self._nchan = sf, kind, nchan
+        self._dtype = np.dtype(dtype)
+        if kind == 'analytic':
+            self._dtype = np.result_type(self._dtype, np.complex64)
+        self._fcnKind = _getKind(kind)
+        self._design = [_streamDesign(sf, k, filtname, cycle, order)
+                        for k in f]
+        self.latency = np.array([k[-1] for k in self._design])
+        self.reset()
+
+    def __str__(self):
+        return 'Stream(kind='+self._kind+', nchan='+str(self._nchan) + \
+            ', nbands='+str(len(self.f))+')'
+
+    def reset(self):
+        """Reset the states of the filters"""
+        self._zi = None
+
+    def push(self, x):
+        """Process a new block of data
+
+        Args:
+            x: array
+                Block of shape (nsamples,) or (nsamples x nchan)
+
+        Return:
+            xf: array
+                The extracted informations of shape
+                (n frequency x nsamples x nchan)
+        """
+        x = np.asarray(x, dtype=float)
+        if x.ndim == 1:
+            x = x[:, np.newaxis]
+        if x.shape[1] != self._nchan:
+            raise ValueError('The second dimension must be '+str(self._nchan))
+        if not x.shape[0]:
+            return np.zeros((len(self.f),) + x.shape, dtype=self._dtype)
+        # Initialize the states on the first sample :
+        if self._zi is None:
+            self._zi = _streamInit(self._design, x[0, :])
+        xf = self._fcnKind(_streamApply(x, self._design, self._zi))
+        if np.iscomplexobj(xf) and (self._dtype.kind != 'c'):
+            xf = xf.real
+        return xf.astype(self._dtype, copy=False)
+
+
+def filtcache_info():
+    """Get informations about the caches of designed filters.
+
+    Filter coefficients are designed once for each combination of
+    (sf, band, npts, filtname, cycle, order) and shared by the whole process
+    (fextract, spectral features and coupling features). The frequency
+    responses of the 'fft' method, the kernels of the 'wavelet' and
+    'multitaper' methods, the DPSS tapers and the FIR Hilbert transformers
+    of the streams are cached in the same way.
+
+    Return:
+        info: dict
+            Cache statistics (namedtuple with the fields hits, misses,
+            maxsize and currsize) of each cache. The keys are 'filter',
+            'fft', 'wavelet', 'multitaper', 'dpss' and 'hilbertfir'.
+    """
+    return _filtcache_info()
+
+
+def filtcache_clear():
+    """Clear the caches of designed filters, responses and kernels and reset
+    the hit/miss counters.
+    """
+    _filtcache_clear()
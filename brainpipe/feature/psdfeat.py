@@ -1,9 +1,11 @@
 import numpy as np
 from scipy.signal import welch
-from itertools import product
+from scipy.fft import rfft, rfftfreq
+from numpy.lib.stride_tricks import sliding_window_view
 
 from brainpipe.tools import binarize
-from brainpipe.feature.utils._feat import _manageWindow
+from brainpipe.feature.utils._feat import _manageWindow, _checkref
+from brainpipe.feature.utils._filtering import _dpss
 from brainpipe.visual.cmon_plt import tilerplot
 
 
@@ -26,6 +28,16 @@ commondoc = """
 
         time: list/array, optional [def: None]
             Define a specific time vector
+
+        method: string, optional [def: 'welch']
+            Method to estimate the PSD. Use either 'welch' or 'multitaper'.
+            For the multitaper method, the DPSS tapers are computed once and
+            all tapers, windows and trials are transformed in a single
+            batched FFT.
+
+        NW: float, optional [def: 4.]
+            Time half-bandwidth product of the DPSS tapers (multitaper
+            method). 2*NW-1 tapers are used.
 """
 
 supdoc = """
@@ -52,7 +64,7 @@ getdoc = """Get the {feat}
 
         Kargs:
             kwargs: any supplementar argument are directly passed to the welch
-            function of scipy.
+            function of scipy (welch method only).
 """
 
 
@@ -62,8 +74,11 @@ class PSD(tilerplot):
     """
     __doc__ += commondoc
 
-    def __init__(self, sf, npts, step=None, width=None, time=None):
+    def __init__(self, sf, npts, step=None, width=None, time=None,
+                 method='welch', NW=4.):
+        _checkref('method', method, ['welch', 'multitaper'])
         self._sf, self._npts = sf, npts
+        self._method, self._NW = method, NW
         # Manage time and frequencies:
         self._window, self.xvec = _manageWindow(npts, window=None, width=width,
                                                 step=step, time=time)
@@ -78,14 +93,15 @@ class PSD(tilerplot):
             x = x[np.newaxis, ...]
         self._nelec, self._npts, self._ntrials = x.shape
 
-        # Split x in window:
+        # Split x in window (strided view, no copy):
         if self._window is not None:
-            x = np.transpose(
-                np.array([x[:, k[0]:k[1], :] for k in self._window]), (
-                                                           1, 2, 0, 3))
+            x = _windowView(x, self._window)
 
         # Compute PSD:
-        return welch(x, fs=self._sf, axis=1, **kwargs)
+        if self._method == 'welch':
+            return welch(x, fs=self._sf, axis=1, **kwargs)
+        elif self._method == 'multitaper':
+            return _multitaper(x, self._sf, self._NW)
 
 PSD.get.__doc__ += getdoc.format(feat='PSD')+"""
         Returns:
@@ -102,7 +118,7 @@ class powerPSD(tilerplot):
     __doc__ += commondoc + supdoc
 
     def __init__(self, sf, npts, f=[60, 200], step=None, width=None,
-                 time=None):
+                 time=None, method='welch', NW=4.):
         # Check the type of f:
         if (len(f) == 4) and isinstance(f[0], (int, float)):
             self.yvec = binarize(f[0], f[1], f[2], f[3], kind='list')
@@ -110,14 +126,19 @@ class powerPSD(tilerplot):
             self.yvec = f
         if not isinstance(f[0], list):
             self.yvec = [f]
-        self._psd = PSD(sf, npts, step=step, width=width, time=time)
+        self._psd = PSD(sf, npts, step=step, width=width, time=time,
+                        method=method, NW=NW)
 
     def get(self, x, **kwargs):
         """
         """
         fpsd, amp = self._psd.get(x, **kwargs)
-        return np.array([amp[:, (fpsd >= k[0])*(fpsd <= k[1]), ...].mean(
-                                                     1) for k in self.yvec])
+        # Band-averaging matrix (nbands, nfce) :
+        mask = np.array([(fpsd >= k[0])*(fpsd <= k[1]) for k in self.yvec])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bands = mask / mask.sum(1, keepdims=True)
+        # Average all the bands at once :
+        return np.einsum('bf,ef...->be...', bands, amp)
 
 powerPSD.get.__doc__ += getdoc.format(feat='PSD power')+"""
         Return:
@@ -125,6 +146,42 @@ powerPSD.get.__doc__ += getdoc.format(feat='PSD power')+"""
 """
 
 
+def _windowView(x, window):
+    """Split x (nelectrodes, npts, ntrials) in windows.
+
+    Return an array of shape (nelectrodes, width, nwin, ntrials). For windows
+    of equal width and regularly spaced, this is a strided view of x.
+    """
+    starts = np.array([k[0] for k in window])
+    widths = np.unique([k[1] - k[0] for k in window])
+    step = starts[1] - starts[0] if len(starts) > 1 else 1
+    if (len(widths) == 1) and (step > 0) and np.all(np.diff(starts) == step):
+        xw = sliding_window_view(x, widths[0], axis=1)
+        xw = xw[:, starts[0]::step, ...][:, 0:len(starts), ...]
+        return np.transpose(xw, (0, 3, 1, 2))
+    return np.transpose(np.array([x[:, k[0]:k[1], :] for k in window]),
+                        (1, 2, 0, 3))
+
+
+def _multitaper(x, sf, NW):
+    """Multitaper PSD along the second axis of x.
+
+    The tapered copies of every electrode, window and trial are transformed
+    in a single real FFT. Return the frequency vector and the one-sided PSD
+    with the frequencies on the second axis (like welch).
+    """
+    npts = x.shape[1]
+    tapers = _dpss(npts, float(NW))
+    sh = (len(tapers), 1, npts) + (1,) * (x.ndim - 2)
+    # Remove the mean (same default detrending as welch) :
+    x = x - x.mean(axis=1, keepdims=True)
+    xfft = rfft(tapers.reshape(sh) * x[np.newaxis, ...], axis=2)
+    psd = np.mean(np.square(np.abs(xfft)), axis=0) / sf
+    # One-sided density :
+    psd[:, 1:(npts + 1) // 2, ...] *= 2
+    return rfftfreq(npts, 1 / sf), psd
+
+
 class SpectralEntropy(tilerplot):
 
     """Compute the spectral entropy based on psd of multiple electrodes.
@@ -139,14 +196,11 @@ class SpectralEntropy(tilerplot):
         """
         fpsd, amp = self._psd.get(x, **kwargs)
         N = len(fpsd)
-        ne, namp, nw, nt = amp.shape
-        iteract = product(range(ne), range(nw), range(nt))
-
-        xentropy = np.zeros((ne, nw, nt))
-        for e, w, t in iteract:
-            curamp = amp[e, :, w, t]
-            curamp /= np.sum(curamp)
-            xentropy[e, w, t] = -(1/np.log(N))*np.sum(curamp*np.log(curamp))
+
+        # Normalized spectrum and entropy of every electrodes, windows and
+        # trials at once :
+        amp = amp / np.sum(amp, axis=1, keepdims=True)
+        xentropy = -(1/np.log(N))*np.sum(amp*np.log(amp), axis=1)
 
         return xentropy
 
@@ -0,0 +1,123 @@
+"""Test spectral features."""
+import numpy as np
+from scipy.stats import wilcoxon, kruskal
+
+from brainpipe.feature import (power, TF, phase, PLF, amplitude, sigfilt,
+                               spectral_bundle)
+from brainpipe.tools import binArray
+from brainpipe.statistics import (perm_swap, perm_metric, perm_2pvalue,
+                                  circ_rtest)
+
+
+class TestBasics(object):  # noqa
+
+    sf, npts = 512., 1000
+
+    def _generate_array(self, n_elec=2, n_trials=10):
+        return np.random.RandomState(0).rand(n_elec, self.npts, n_trials)
+
+    def test_windowed_reduction(self):  # noqa
+        x = self._generate_array()
+        kw = dict(f=[[2, 4], [60, 200]], split=[None, 35], baseline=(10, 100))
+        for norm in [None, 1, 2, 3, 4]:
+            xw = power(self.sf, self.npts, norm=norm, width=100, step=50,
+                       **kw).get(x, n_jobs=1)[0]
+            xf = power(self.sf, self.npts, norm=norm, **kw).get(x, n_jobs=1)[0]
+            window = power(self.sf, self.npts, width=100, step=50)._window
+            np.testing.assert_allclose(xw, binArray(xf, window, axis=2)[0])
+        # Filter-bank methods (shared forward transform) :
+        for method in ['fft', 'wavelet', 'multitaper']:
+            xw = power(self.sf, self.npts, method=method, width=100, step=50,
+                       **kw).get(x, n_jobs=1)[0]
+            xf = power(self.sf, self.npts, method=method, **kw).get(
+                x, n_jobs=1)[0]
+            np.testing.assert_allclose(xw, binArray(xf, window, axis=2)[0],
+                                       rtol=1e-12)
+        # Time-frequency map (mean through trials) :
+        kw = dict(f=(2, 100, 20, 20), baseline=(10, 100), norm=4)
+        xw = TF(self.sf, self.npts, width=100, step=50, **kw).get(x)[0]
+        xf = TF(self.sf, self.npts, **kw).get(x)[0]
+        np.testing.assert_allclose(xw, binArray(xf, window, axis=2)[0])
+
+    def test_out_of_core(self, tmpdir):  # noqa
+        x = self._generate_array(n_elec=5)
+        fname = str(tmpdir.join('x.npy'))
+        np.save(fname, x)
+        xm = np.load(fname, mmap_mode='r')
+        pw = power(self.sf, self.npts, f=[[2, 4], [8, 13]], width=100,
+                   step=50)
+        xf = pw.get(x, n_jobs=1)[0]
+        fout = str(tmpdir.join('xf.npy'))
+        xo = pw.get(xm, n_jobs=1, out=fout, max_memory=1)[0]
+        np.testing.assert_allclose(xo, xf)
+        np.testing.assert_allclose(np.load(fout), xf)
+        # Preallocated output :
+        out = np.zeros_like(xf)
+        pw.get(x, n_jobs=1, out=out, max_memory=2 * x[0, ...].nbytes)
+        np.testing.assert_allclose(out, xf)
+
+    def test_permutation(self):  # noqa
+        x = self._generate_array(n_elec=1)
+        pw = power(self.sf, self.npts, f=[[2, 4], [60, 200]], width=100,
+                   step=50, baseline=(10, 100))
+        xf, pv = pw.get(x, n_jobs=1, statmeth='permutation', n_perm=20)
+        # Reference for a single window (swaps of the random state pts+k) :
+        xw = xf[:, 0, 3, :]
+        xb = power(self.sf, self.npts, f=[[2, 4], [60, 200]],
+                   baseline=(10, 100)).get(x, n_jobs=1)[0][:, 0, 10:100, :]
+        xb = xb.mean(1)
+        perm = perm_swap(xw, xb, n_perm=20, axis=1, rndstate=3)[0]
+        fcn = perm_metric('m_center')
+        perm = fcn(perm, xb).mean(2)
+        ref = perm_2pvalue(fcn(xw, xb).mean(1), perm, 20, tail=2)
+        np.testing.assert_array_equal(pv[:, 0, 3], ref)
+
+    def test_rank_tests(self):  # noqa
+        x = self._generate_array(n_elec=1, n_trials=30)
+        kw = dict(f=[[2, 4], [60, 200]], baseline=(10, 100))
+        xf = power(self.sf, self.npts, **kw).get(x, n_jobs=1)[0][:, 0, ...]
+        xb = xf[:, 10:100, :].mean(1)
+        for st, fcn in [('wilcoxon', wilcoxon), ('kruskal', kruskal)]:
+            pv = power(self.sf, self.npts, **kw).get(x, n_jobs=1,
+                                                     statmeth=st)[1]
+            for f, t in [(0, 0), (1, 500), (1, 999)]:
+                assert pv[f, 0, t] == fcn(xf[f, t, :], xb[f, :])[1]
+        # Normal approximation :
+        pv = power(self.sf, self.npts, **kw).get(x, n_jobs=1, approx=True,
+                                                 statmeth='wilcoxon')[1]
+        assert pv[1, 0, 500] == wilcoxon(xf[1, 500, :], xb[1, :],
+                                         method='approx')[1]
+
+    def test_plf(self):  # noqa
+        x = self._generate_array()
+        pha, pvp = phase(self.sf, self.npts, f=[[2, 4], [5, 7]]).get(
+            x, n_jobs=1)
+        plf, pv = PLF(self.sf, self.npts, f=[[2, 4], [5, 7]]).get(x, n_jobs=1)
+        np.testing.assert_allclose(plf, np.abs(np.exp(1j * pha).mean(3)))
+        np.testing.assert_allclose(pv, pvp)
+        np.testing.assert_allclose(pv[1, 0, 500], circ_rtest(
+            pha[1, 0, 500, :])[0])
+        # Single band and single window :
+        for kw in [dict(f=[2, 4]), dict(f=[[2, 4], [5, 7]],
+                                        window=[(0, 100)])]:
+            pha, pvp = phase(self.sf, self.npts, **kw).get(x, n_jobs=1)
+            plf, pv = PLF(self.sf, self.npts, **kw).get(x, n_jobs=1)
+            assert pvp.shape == plf.shape == pv.shape == pha.shape[:-1]
+
+    def test_spectral_bundle(self):  # noqa
+        x = self._generate_array()
+        kw = dict(f=[[2, 4], [60, 200]], method='hilbert', width=100, step=50)
+        xb = spectral_bundle(self.sf, self.npts, **kw).get(x, n_jobs=1)
+        for k, fcn in [('phase', phase), ('amplitude', amplitude),
+                       ('power', power)]:
+            xf = fcn(self.sf, self.npts, **kw).get(x, n_jobs=1)[0]
+            if k == 'phase':
+                xf = np.swapaxes(xf, 0, 1)
+            np.testing.assert_allclose(xb[k], xf, atol=1e-12)
+        xf = sigfilt(self.sf, self.npts, f=kw['f'], width=100, step=50).get(
+            x, n_jobs=1)[0]
+        np.testing.assert_allclose(xb['signal'], xf, atol=1e-12)
+        # Single precision :
+        xb = spectral_bundle(self.sf, self.npts, kinds='power',
+                             dtype=np.float32, **kw).get(x, n_jobs=1)
+        assert xb['power'].dtype == np.float32
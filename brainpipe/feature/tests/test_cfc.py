@@ -0,0 +1,174 @@
+"""Test coupling features."""
+import numpy as np
+
+from brainpipe.feature import (PhaseLockedPower, pac, erpac, pfdphase, PLV,
+                               cfcsession)
+from brainpipe.feature.coupling.pac import pacmeth
+from brainpipe.feature.coupling.pac.pacmeth import (CfcMethodList, MVL, _kl_hr,
+                                                   CfcCircShift, CfcTimeLag)
+from brainpipe.statistics import circ_corrcc, circ_rtest
+
+
+class TestCfc(object):  # noqa
+
+    sf, npts = 512., 1000
+
+    def _generate_array(self, n_elec=2, n_trials=10):
+        rnd = np.random.RandomState(0)
+        t = np.arange(self.npts) / self.sf
+        phi = 2 * np.pi * rnd.rand(n_elec, 1, n_trials)
+        sine = np.sin(2 * np.pi * 10 * t[np.newaxis, :, np.newaxis] + phi)
+        return sine + rnd.rand(n_elec, self.npts, n_trials)
+
+    def test_phase_locked_power(self):  # noqa
+        x = self._generate_array()
+        plp = PhaseLockedPower(self.sf, self.npts, f=(2, 100, 20, 20),
+                               baseline=(10, 100), norm=3)
+        xpow, xpha, xsig = plp.get(x, 500)
+        assert xpow.shape == (4, 2, self.npts)
+        assert xpha.shape == xsig.shape == x.shape
+        # Every trial is aligned on a peak of the filtered signal :
+        assert np.all(xsig[:, 500, :] >= xsig[:, 499, :])
+        assert np.all(xsig[:, 500, :] >= xsig[:, 501, :])
+        # Same as electrode per electrode :
+        for k in range(x.shape[0]):
+            pw, pa, sg = plp.get(x[k, ...], 500)
+            np.testing.assert_allclose(pw, xpow[:, k, :])
+            np.testing.assert_allclose(pa, xpha[k, ...])
+            np.testing.assert_allclose(sg, xsig[k, ...])
+
+    def test_cfcsession(self):  # noqa
+        x = self._generate_array()
+        kw = dict(pha_f=[[2, 4], [8, 12]], amp_f=[60, 200])
+        mvl = pac(self.sf, self.npts, Id='100', **kw).get(x, x, n_jobs=1)[0]
+        pfp = pfdphase(self.sf, self.npts, **kw).get(x, x, n_jobs=1)[0]
+        np.random.seed(0)
+        xerp = erpac(self.sf, self.npts, **kw).get(x, x, n_perm=5,
+                                                   n_jobs=1)[0]
+        plv = pac(self.sf, self.npts, Id='400', **kw).get(x, x, n_jobs=1)[0]
+        with cfcsession() as session:
+            xs = pac(self.sf, self.npts, Id='100', **kw).get(x, x, n_jobs=1)
+            assert len(session) == 2
+            pac(self.sf, self.npts, Id='200', **kw).get(x, x, n_jobs=1)
+            xp = pfdphase(self.sf, self.npts, **kw).get(x, x, n_jobs=1)
+            np.random.seed(0)
+            xe = erpac(self.sf, self.npts, **kw).get(x, x, n_perm=5,
+                                                     n_jobs=1)
+            xl = pac(self.sf, self.npts, Id='400', **kw).get(x, x, n_jobs=1)
+            # The phase of PLV is shared with the coupling measures :
+            PLV(self.sf, self.npts, f=kw['pha_f']).get(x, x, n_perm=2,
+                                                       n_jobs=1)
+            assert len(session) == 2
+        assert len(session) == 0
+        np.testing.assert_array_equal(xs[0], mvl)
+        np.testing.assert_array_equal(xp[0], pfp)
+        np.testing.assert_array_equal(xe[0], xerp)
+        np.testing.assert_array_equal(xl[0], plv)
+
+    def test_pac_models(self):  # noqa
+        rnd = np.random.RandomState(0)
+        pha = np.angle(np.exp(2j * np.pi * rnd.rand(2, 300, 5)))
+        amp = rnd.rand(3, 300, 5)
+        for Id in range(1, 6):
+            model = CfcMethodList(Id, nbins=18)[0]
+            xpac = model(pha, amp, 18)
+            assert xpac.shape == (3, 2, 5)
+            # Same as trial per trial :
+            for k in range(5):
+                np.testing.assert_allclose(xpac[..., k], model(
+                    np.matrix(pha[..., k]), np.matrix(amp[..., k]), 18))
+        # Mean Vector Length :
+        mvl = np.abs((amp[0, :, 0] * np.exp(1j * pha[1, :, 0])).mean())
+        np.testing.assert_allclose(MVL(pha, amp)[0, 1, 0], mvl)
+
+    def test_pac_surrogates(self, monkeypatch):  # noqa
+        x = self._generate_array()
+        kw = dict(pha_f=[[2, 4], [8, 12]], amp_f=[[60, 200], [80, 150]])
+        for Id in ['114', '224', '334', '444']:
+            np.random.seed(0)
+            xpac, pv = pac(self.sf, self.npts, Id=Id, **kw).get(
+                x, x, n_perm=10, n_jobs=1, matricial=True)
+            assert pv.shape == (2, 2, 2, 1)
+            # Blocks of a single permutation :
+            monkeypatch.setattr(pacmeth, '_SUROMEMORY', 1)
+            np.random.seed(0)
+            xb, pb = pac(self.sf, self.npts, Id=Id, **kw).get(
+                x, x, n_perm=10, n_jobs=1)
+            monkeypatch.undo()
+            np.testing.assert_allclose(xb, xpac)
+            np.testing.assert_array_equal(pb, pv)
+
+    def test_kl_hr_binning(self):  # noqa
+        rnd = np.random.RandomState(0)
+        pha = np.angle(np.exp(2j * np.pi * rnd.rand(2, 500, 3)))
+        amp = rnd.rand(3, 500, 3)
+        abin, abinsum = _kl_hr(pha, amp, 18)
+        assert abin.shape == (3, 2, 18, 3)
+        np.testing.assert_allclose(abinsum[:, :, 0, :], abin.sum(2))
+        # Mean amplitude in each phase bin :
+        idx = np.floor((pha[1, :, 2] + np.pi) / (2 * np.pi / 18))
+        for k in [0, 9, 17]:
+            np.testing.assert_allclose(abin[0, 1, k, 2],
+                                       amp[0, idx == k, 2].mean())
+
+    def test_lag_surrogates(self):  # noqa
+        rnd = np.random.RandomState(0)
+        pha = np.angle(np.exp(2j * np.pi * rnd.rand(2, 300, 4)))
+        amp = rnd.rand(3, 300, 4)
+        for Id in [1, 2, 5]:
+            model = CfcMethodList(Id, nbins=18)[0]
+            np.random.seed(0)
+            suro = CfcCircShift(pha, amp, model, n_perm=5)
+            np.random.seed(0)
+            lags = np.random.randint(1, 300, size=(5, 4))
+            # Surrogate of a lagged amplitude :
+            ref = model(pha[..., 2], np.roll(amp[..., 2], lags[3, 2], axis=1))
+            np.testing.assert_allclose(suro[2, :, :, 3], ref, atol=1e-12)
+        np.random.seed(0)
+        suro = CfcTimeLag(pha, amp, model, n_perm=5, tlag=[10, 20])
+        assert suro.shape == (4, 3, 2, 5)
+        # Pac with lag surrogates :
+        x = self._generate_array()
+        for Id in ['154', '264']:
+            xpac, pv = pac(self.sf, self.npts, Id=Id, tlag=[100, 900]).get(
+                x, x, n_perm=10, n_jobs=1)
+            assert pv.shape == (1, 1, 2, 1)
+
+    def test_erpac(self, monkeypatch):  # noqa
+        x = self._generate_array(n_trials=20)
+        kw = dict(pha_f=[[2, 4], [8, 12]], amp_f=[[60, 200], [80, 150]])
+        np.random.seed(0)
+        xerpac, pv = erpac(self.sf, self.npts, **kw).get(x, x, n_perm=20,
+                                                         n_jobs=1)
+        assert xerpac.shape == pv.shape == (2, 2, 2, self.npts)
+        assert np.all((pv >= 0) & (pv <= 1))
+        # Blocks of a single permutation :
+        monkeypatch.setattr(pacmeth, '_SUROMEMORY', 1)
+        np.random.seed(0)
+        xb, pb = erpac(self.sf, self.npts, **kw).get(x, x, n_perm=20,
+                                                     n_jobs=1)
+        monkeypatch.undo()
+        np.testing.assert_allclose(xb, xerpac)
+        np.testing.assert_allclose(pb, pv)
+        # Circular-linear correlation of all time points at once :
+        rnd = np.random.RandomState(0)
+        alpha, xl = 2 * np.pi * rnd.rand(5, 30), rnd.rand(5, 30)
+        rho, pval = circ_corrcc(alpha, xl, axis=-1)
+        for k in range(5):
+            np.testing.assert_allclose((rho[k], pval[k]),
+                                       circ_corrcc(alpha[k], xl[k]))
+
+    def test_pfdphase(self):  # noqa
+        x = self._generate_array()
+        kw = dict(pha_f=[[2, 4], [8, 12]], amp_f=[[60, 200], [80, 150]])
+        pfp, prf, ampbin, pv = pfdphase(self.sf, self.npts, nbins=18,
+                                        **kw).get(x, x, n_jobs=1)
+        assert pfp.shape == (2, 2, 2, 1, 10)
+        assert prf.shape == pv.shape == (2, 2, 2, 1)
+        assert ampbin.shape == (2, 2, 2, 1, 18, 10)
+        np.testing.assert_allclose(ampbin.sum(4), 1.)
+        # The preferred phase is the center of the bin of maximum amplitude :
+        np.testing.assert_array_equal(pfp, ampbin.argmax(4) * 20. + 10.)
+        # Rayleigh test of the preferred phases (in radians) :
+        np.testing.assert_allclose(pv[1, 0, 1, 0], circ_rtest(
+            np.deg2rad(pfp[1, 0, 1, 0, :]))[0])
@@ -0,0 +1,152 @@
+"""Test filtering related functions."""
+import numpy as np
+import pytest
+from scipy.signal import filtfilt, hilbert
+
+from brainpipe.feature import power
+from brainpipe.feature.filtering import (fextract, filtcache_info,
+                                         filtcache_clear)
+from brainpipe.feature.utils._filtering import _analytic, fir1, fir_order
+
+
+class TestFiltering(object):  # noqa
+
+    sf, npts = 512., 1000
+
+    def _generate_array(self, n_trials=10):
+        return np.random.RandomState(0).rand(self.npts, n_trials)
+
+    def test_filtcache(self):  # noqa
+        filtcache_clear()
+        x = self._generate_array()
+        fobj = fextract('hilbert', 'power')
+        f = [[2, 4], [60, 200]]
+        xf = fobj.apply(x, fobj.get(self.sf, f, self.npts))
+        info = filtcache_info()['filter']
+        assert (info.misses == 2) and (info.hits == 0)
+        # Same bands, same filter -> no new design :
+        xf_c = fobj.apply(x, fobj.get(self.sf, f, self.npts))
+        info = filtcache_info()['filter']
+        assert (info.misses == 2) and (info.hits == 2)
+        assert np.array_equal(xf, xf_c)
+        # The cache is shared with the spectral features :
+        pobj = power(self.sf, self.npts, f=f, method='hilbert')
+        pobj.get(x[np.newaxis, ...], n_jobs=1)
+        assert filtcache_info()['filter'].misses == 2
+        # Every cache is cleared :
+        fobj = fextract('wavelet', 'power')
+        fobj.apply(x, fobj.get(self.sf, f, self.npts))
+        assert filtcache_info()['wavelet'].currsize == 1
+        filtcache_clear()
+        info = filtcache_info()
+        assert all([k.currsize == 0 for k in info.values()])
+
+    def test_fft_filterbank(self):  # noqa
+        x = self._generate_array()
+        f = [[8, 13], [60, 200]]
+        xf = dict()
+        for meth in ['hilbert', 'fft']:
+            fobj = fextract(meth, 'amplitude')
+            xf[meth] = fobj.apply(x, fobj.get(self.sf, f, self.npts))
+        # Both methods should match outside of the edges :
+        sl = slice(200, self.npts - 200)
+        assert xf['fft'].shape == (len(f), self.npts, x.shape[1])
+        np.testing.assert_allclose(xf['fft'][:, sl, :], xf['hilbert'][:, sl, :],
+                                   rtol=0., atol=1e-2 * xf['hilbert'].max())
+
+    def test_wavelet(self):  # noqa
+        x = self._generate_array()
+        f, width = [[8, 12], [60, 80]], 7
+        fobj = fextract('wavelet', 'phase', wltWidth=width, wltCorr=None)
+        pha = fobj.apply(x, fobj.get(self.sf, f, self.npts))
+        assert pha.shape == (len(f), self.npts, x.shape[1])
+        assert pha.std() > 1.
+        # Compare the amplitude with a direct convolution :
+        fobj = fextract('wavelet', 'amplitude', wltWidth=width, wltCorr=None)
+        amp = fobj.apply(x, fobj.get(self.sf, f, self.npts))
+        for k, fce in enumerate(f):
+            fc = (fce[0] + fce[1]) / 2
+            st = 1 / (2 * np.pi * fc / width)
+            t = np.arange(-3.5 * st, 3.5 * st, 1 / self.sf)
+            m = np.exp(-np.square(t) / (2 * st**2)) * np.exp(2j * np.pi * fc * t)
+            m /= (st * np.sqrt(np.pi))**(1 / 2)
+            y = 2 * np.abs(np.convolve(x[:, 0], m)) / self.sf
+            y = y[int(np.ceil(len(m) / 2)) - 1:len(y) - len(m) // 2]
+            np.testing.assert_allclose(amp[k, :, 0], y, atol=1e-12)
+        # The signal of the wavelet is the modulus of the coefficients :
+        fobj = fextract('wavelet', 'signal', wltWidth=width, wltCorr=None)
+        sig = fobj.apply(x, fobj.get(self.sf, f, self.npts))
+        np.testing.assert_array_equal(sig, amp)
+
+    def test_hilbert(self):  # noqa
+        npts = self.npts + 1
+        x = np.random.RandomState(1).rand(npts, 10)
+        f = [[8, 13], [60, 200]]
+        fobj = fextract('hilbert', 'signal')
+        # Complex analytic signal of all the bands :
+        fMeth = fobj.get(self.sf, f, npts)
+        xh = fMeth.bank(x)
+        # Previous implementation (filtfilt + hilbert on each column) :
+        for k, fce in enumerate(f):
+            order = fir_order(self.sf, npts, fce[0], cycle=3)
+            b, a = fir1(order, np.array(fce) / (self.sf / 2))
+            xf = filtfilt(b, a, x, padlen=order, axis=0)
+            ref = np.array([hilbert(xf[:, i]) for i in range(x.shape[1])]).T
+            np.testing.assert_allclose(xh[k, ...], ref, rtol=0., atol=1e-12)
+            # Method of a single band :
+            np.testing.assert_allclose(fMeth[k](x), ref, rtol=0., atol=1e-12)
+        # Simple precision :
+        xs = _analytic(x, axis=0, dtype=np.complex64)
+        assert xs.dtype == np.complex64
+        np.testing.assert_allclose(xs, hilbert(x, axis=0), atol=1e-5)
+
+    def test_dtype(self):  # noqa
+        x = self._generate_array()
+        f = [[8, 13], [60, 200]]
+        for meth in ['hilbert', 'hilbert1', 'fft', 'wavelet']:
+            xf = dict()
+            for dt in [np.float64, np.float32]:
+                fobj = fextract(meth, 'power', dtype=dt)
+                xf[dt] = fobj.apply(x, fobj.get(self.sf, f, self.npts))
+            assert xf[np.float32].dtype == np.float32
+            np.testing.assert_allclose(xf[np.float32], xf[np.float64],
+                                       rtol=1e-3, atol=1e-5)
+
+    def test_multitaper(self):  # noqa
+        t = np.arange(self.npts) / self.sf
+        x = np.c_[3 * np.cos(2 * np.pi * 100 * t), np.cos(2 * np.pi * 10 * t)]
+        fobj = fextract('multitaper', 'amplitude')
+        xf = fobj.apply(x, fobj.get(self.sf, [[80, 120], [8, 12]], self.npts))
+        assert xf.shape == (2, self.npts, 2)
+        mid = slice(300, 700)
+        np.testing.assert_allclose(xf[0, mid, 0], 3., rtol=.05)
+        np.testing.assert_allclose(xf[1, mid, 1], 1., rtol=.05)
+        assert xf[1, mid, 0].max() < .1
+
+    def test_stream(self):  # noqa
+        t = np.arange(4 * self.npts) / self.sf
+        x = np.c_[2 * np.cos(2 * np.pi * 10 * t), np.cos(2 * np.pi * 100 * t)]
+        for filtname in ['fir1', 'butter']:
+            fobj = fextract('hilbert', 'amplitude', filtname=filtname)
+            fs = fobj.stream(self.sf, [[8, 12], [80, 120]], nchan=2)
+            xb = np.concatenate([fs.push(x[k:k + 37, :]) for k in range(
+                0, x.shape[0], 37)], axis=1)
+            fs.reset()
+            np.testing.assert_allclose(xb, fs.push(x), atol=1e-12)
+            np.testing.assert_allclose(xb[0, 2000:, 0], 2., rtol=.01)
+            np.testing.assert_allclose(xb[1, 2000:, 1], 1., rtol=.01)
+        # Only the filter-based methods can be streamed :
+        for meth in ['wavelet', 'fft', 'multitaper', 'filter']:
+            with pytest.raises(ValueError):
+                fextract(meth, 'amplitude').stream(self.sf, [8, 12])
+
+    def test_sos(self):  # noqa
+        t = np.arange(4 * self.npts) / self.sf
+        x = np.c_[np.cos(2 * np.pi * 10 * t), np.cos(2 * np.pi * 30 * t)]
+        # High order and narrow band (unstable in (b, a) form) :
+        for meth in ['hilbert', 'fft']:
+            fobj = fextract(meth, 'amplitude', filtname='butter', order=8)
+            xf = fobj.apply(x, fobj.get(self.sf, [8, 12], x.shape[0]))
+            assert np.all(np.isfinite(xf))
+            np.testing.assert_allclose(xf[0, 1000:-1000, 0], 1., rtol=.01)
+            assert xf[0, 1000:-1000, 1].max() < .01
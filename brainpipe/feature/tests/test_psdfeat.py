@@ -0,0 +1,47 @@
+"""Test PSD based features."""
+import numpy as np
+from scipy.signal import welch, periodogram
+from scipy.signal.windows import dpss
+
+from brainpipe.feature import PSD, powerPSD, SpectralEntropy
+
+
+class TestPsdFeat(object):  # noqa
+
+    sf, npts = 512., 1000
+
+    def _generate_array(self, n_elec=2, n_trials=10):
+        return np.random.RandomState(0).rand(n_elec, self.npts, n_trials)
+
+    def test_psd(self):  # noqa
+        x = self._generate_array()
+        psd = PSD(self.sf, self.npts, width=200, step=100)
+        f, amp = psd.get(x)
+        assert amp.shape == (2, len(f), len(psd._window), 10)
+        for k, (k0, k1) in enumerate(psd._window):
+            np.testing.assert_array_equal(amp[:, :, k, :], welch(
+                x[:, k0:k1, :], fs=self.sf, axis=1)[1])
+        # Band power :
+        xpow = powerPSD(self.sf, self.npts, f=[[2, 20], [60, 200]],
+                        width=200, step=100).get(x)
+        np.testing.assert_allclose(xpow[1, ...], amp[:, (f >= 60) * (
+            f <= 200), ...].mean(1))
+        # Spectral entropy :
+        xent = SpectralEntropy(self.sf, self.npts, width=200,
+                               step=100).get(x)
+        p = amp / amp.sum(1, keepdims=True)
+        np.testing.assert_allclose(xent, -(p * np.log(p)).sum(1) / np.log(
+            len(f)))
+
+    def test_psd_multitaper(self):  # noqa
+        x = self._generate_array()
+        psd = PSD(self.sf, self.npts, width=200, step=100,
+                  method='multitaper', NW=3.)
+        f, amp = psd.get(x)
+        assert amp.shape == (2, len(f), len(psd._window), 10)
+        # Average of the periodograms of each DPSS taper :
+        tapers = dpss(200, 3., 5)
+        for k, (k0, k1) in enumerate(psd._window):
+            ref = np.mean([periodogram(x[:, k0:k1, :], fs=self.sf, window=i,
+                                       axis=1)[1] for i in tapers], 0)
+            np.testing.assert_allclose(amp[:, :, k, :], ref, rtol=1e-10)
@@ -7,6 +7,8 @@ import warnings
 __all__ = [
             '_manageWindow',
             '_manageFrequencies',
+            '_manageOutput',
+            '_manageChunk',
             'normalize',
             '_checkref'
           ]
@@ -98,6 +100,53 @@ def _manageWindow(npts, window=None, width=None, step=None, kind='tuple',
     return window, xvec
 
 
+def _manageOutput(out, shape, dtype):
+    """Manage the output container of a feature
+
+    Parameters
+    ----------
+    out : None, string or array_like
+        None for an array in memory, a path to a .npy file to create a
+        memory-mapped array or any preallocated array-like (np.ndarray,
+        np.memmap, HDF5 dataset...)
+
+    shape : tuple
+        Shape of the output
+
+    dtype : numpy type
+        Type of the output
+    """
+    if out is None:
+        return n.zeros(shape, dtype=dtype)
+    elif isinstance(out, str):
+        return n.lib.format.open_memmap(out, mode='w+', dtype=dtype,
+                                       shape=shape)
+    elif tuple(out.shape) != tuple(shape):
+        raise ValueError("The shape of out must be "+str(shape)+" instead of "
+                         ""+str(tuple(out.shape)))
+    return out
+
+
+def _manageChunk(max_memory, nbytes, nitem):
+    """Number of items to process per chunk
+
+    Parameters
+    ----------
+    max_memory : int or None
+        Memory budget (in bytes). If None, all the items are processed at
+        once.
+
+    nbytes : int
+        Memory needed for a single item (in bytes)
+
+    nitem : int
+        Total number of items
+    """
+    if max_memory is None:
+        return max(nitem, 1)
+    return int(min(max(max_memory // max(nbytes, 1), 1), max(nitem, 1)))
+
+
 def normalize(A, B, norm=0):
     """normalize A by B using the 'norm' parameter
 
@@ -1,41 +1,140 @@
+from functools import lru_cache
+
 import numpy as np
 from numpy.matlib import repmat
-from scipy.signal import filtfilt, butter, bessel, hilbert, hilbert2, detrend
+from scipy.signal import (filtfilt, sosfiltfilt, butter, bessel, hilbert,
+                          hilbert2, detrend, lfilter, lfilter_zi, sosfilt,
+                          sosfilt_zi)
+from scipy.signal.windows import dpss, hamming
+from scipy.fft import fft, rfft, ifft, next_fast_len
 
 __all__ = [
     '_apply_method',
-    '_get_method'
+    '_split_method',
+    '_get_method',
+    '_filtcache_info',
+    '_filtcache_clear',
+    '_streamDesign',
+    '_streamInit',
+    '_streamApply'
 ]
 
+# Maximum number of filter designs kept in memory :
+FILTCACHE_SIZE = 1024
+
+# Methods transforming all the frequency bands in a single call :
+_BANKMETH = ['hilbert', 'fft', 'wavelet', 'multitaper']
+
+
+def _apply_method(x, fMeth, dtrd, method, wltCorr, wltWidth,
+                  dtype=np.float64):
+    x, dtype = _prepInput(x, dtrd, dtype)
+
+    # Apply methods (all the bands at once for filter-banks) :
+    if getattr(fMeth, 'bank', None) is not None:
+        xf = _castBank(fMeth.bank(x), dtype)
+    else:
+        xf = _applyBands(x, fMeth, dtype)
+
+    return _wltCorrect(xf, method, wltCorr, wltWidth)
+
 
-def _apply_method(x, fMeth, dtrd, method, wltCorr, wltWidth):
-    npts, ntrial = x.shape
-    nFce = len(fMeth)
-    xf = np.zeros((nFce, npts, ntrial))
+def _split_method(x, fMeth, index, dtrd, method, wltCorr, wltWidth,
+                  dtype=np.float64):
+    """Apply the methods group of bands per group of bands (generator).
 
-    # Detrend the signal :
+    index is a list of (i0, i1) couples. Yield i0, i1 and the transformed
+    bands i0:i1. For filter-banks, the forward transform of x is computed
+    once and shared by all the groups, so that each group is the same as the
+    corresponding bands of _apply_method.
+    """
+    x, dtype = _prepInput(x, dtrd, dtype)
+
+    if getattr(fMeth, 'split', None) is not None:
+        for i0, i1, xf in fMeth.split(x, index):
+            yield i0, i1, _wltCorrect(_castBank(xf, dtype), method, wltCorr,
+                                      wltWidth)
+    else:
+        for i0, i1 in index:
+            yield i0, i1, _wltCorrect(_applyBands(x, fMeth[i0:i1], dtype),
+                                      method, wltCorr, wltWidth)
+
+
+def _prepInput(x, dtrd, dtype):
+    """Detrend x and convert it to the working precision (a complex dtype is
+    used for the analytic signal)"""
     if dtrd:
         x = detrend(x, axis=0)
+    dtype = np.dtype(dtype)
+    return np.asarray(x, dtype=np.finfo(dtype).dtype), dtype
+
+
+def _castBank(xf, dtype):
+    """Convert the output of a filter-bank to dtype"""
+    if np.iscomplexobj(xf) and (dtype.kind != 'c'):
+        xf = xf.real
+    return xf.astype(dtype, copy=False)
+
 
-    # Apply methods :
-    for k in range(nFce):
+def _applyBands(x, fMeth, dtype):
+    """Apply the method of each band"""
+    xf = np.zeros((len(fMeth),) + x.shape, dtype=dtype)
+    for k in range(len(fMeth)):
         xf[k, ...] = fMeth[k](x)
+    return xf
+
 
-    # Correction for the wavelet (due to the wavelet width):
+def _wltCorrect(xf, method, wltCorr, wltWidth):
+    """Correction for the wavelet (due to the wavelet width)"""
     if (method == 'wavelet') and (wltCorr is not None):
-        w = 3*wltWidth
+        npts, w = xf.shape[1], 3*wltWidth
         xf[:, 0:w, :] = xf[:, w+1:2*w+1, :]
         xf[:, npts-w:npts, :] = xf[:, npts-2*w-1:npts-w-1, :]
-
     return xf
 
 
+class _bankList(list):
+    """List of the methods of each band, with a bank attribute (a method
+    which transforms all the bands at once) and a split attribute (a
+    generator which transforms groups of bands from a single forward
+    transform of the signal)
+    """
+    bank = None
+    split = None
+
+
 def _get_method(sf, f, npts, filtname, cycle, order, axis, method, wltWidth,
                 kind):
     """Get a list of functions of combinaitions: kind // transformation // design
     """
     # Get the kind (power, phase, signal, amplitude)
     fcnKind = _getKind(kind)
+    # The 'signal' of the wavelet is the modulus of its coefficients :
+    if (method == 'wavelet') and (kind == 'signal'):
+        fcnKind = np.abs
+
+    # Filter-bank methods (a single function for all the bands) :
+    if method in _BANKMETH:
+        fMeth = _bankList()
+        for k in f:
+            def fme(x, fce=k):
+                prep, band = _getBank(sf, [fce], npts, method, wltWidth,
+                                      filtname, cycle, order, axis)
+                return fcnKind(band(prep(x), slice(None)))[0]
+            fMeth.append(fme)
+        prep, band = _getBank(sf, f, npts, method, wltWidth, filtname, cycle,
+                              order, axis)
+
+        def fbank(x):
+            return fcnKind(band(prep(x), slice(None)))
+
+        def fsplit(x, index):
+            xp = prep(x)
+            for i0, i1 in index:
+                yield i0, i1, fcnKind(band(xp, slice(i0, i1)))
+        fMeth.bank, fMeth.split = fbank, fsplit
+        return fMeth
+
     fMeth = []
     for k in f:
         def fme(x, fce=k):
@@ -54,53 +153,331 @@ def _getFiltDesign(sf, f, npts, filtname, cycle, order, axis):
     - 'butter'
     - 'bessel'
     """
+    sf, f = float(sf), (float(f[0]), float(f[1]))
+    b, a, sos, fOrder = _filtCoefs(sf, f, npts, filtname, cycle, order)
+    padlen = _coefsPadlen(sos, fOrder)
 
-    if type(f) != np.ndarray:
-        f = np.array(f)
+    # IIR filters are applied as cascaded second-order sections (sosfilt
+    # needs a writeable copy of the cached sections) :
+    if sos is not None:
+        sos = sos.copy()
+
+        def filtSignal(x):
+            return sosfiltfilt(sos, x, padlen=padlen, axis=axis)
+    else:
+        def filtSignal(x):
+            return filtfilt(b, a, x, padlen=padlen, axis=axis)
+
+    return filtSignal
+
+
+@lru_cache(maxsize=FILTCACHE_SIZE)
+def _filtCoefs(sf, f, npts, filtname, cycle, order):
+    """Design the filter coefficients and the order of the fir1 filter.
+
+    Return (b, a, sos, fOrder). The fir1 filter is defined by (b, a) and sos
+    is None. The IIR filters (butter, bessel) are designed as second-order
+    sections (sos), which stay stable for high orders and narrow bands. In
+    that case, b, a and fOrder are None.
+
+    The designs are cached (LRU) across the whole process, so every
+    electrode, band and feature which share the same filter properties
+    only pay once for the design.
+    """
+    f = np.array(f)
+    b, a, sos, fOrder = None, None, None, None
 
     # fir1 filter :
     if filtname == 'fir1':
         fOrder = fir_order(sf, npts, f[0], cycle=cycle)
         b, a = fir1(fOrder, f/(sf / 2))
+        b, a = np.asarray(b), np.asarray(a)
+        b.flags.writeable, a.flags.writeable = False, False
 
     # butterworth filter :
     elif filtname == 'butter':
-        b, a = butter(order, [(2*f[0])/sf, (2*f[1])/sf], btype='bandpass')
-        fOrder = None
+        sos = butter(order, [(2*f[0])/sf, (2*f[1])/sf], btype='bandpass',
+                     output='sos')
 
     # bessel filter :
     elif filtname == 'bessel':
-        b, a = bessel(order, [(2*f[0])/sf, (2*f[1])/sf], btype='bandpass')
-        fOrder = None
+        sos = bessel(order, [(2*f[0])/sf, (2*f[1])/sf], btype='bandpass',
+                     output='sos')
 
-    def filtSignal(x):
-        return filtfilt(b, a, x, padlen=fOrder, axis=axis)
+    # Prevent any modification of the cached coefficients :
+    if sos is not None:
+        sos.flags.writeable = False
 
-    return filtSignal
+    return b, a, sos, fOrder
+
+
+def _filtcaches():
+    """Get the caches of designed filters, responses and kernels"""
+    return {'filter': _filtCoefs, 'fft': _fftResponse,
+            'wavelet': _morletBank, 'multitaper': _multitaperBank,
+            'dpss': _dpss, 'hilbertfir': _hilbertFir}
+
+
+def _filtcache_info():
+    """Get the hits, misses, maxsize and currsize of each filter cache."""
+    return {k: i.cache_info() for k, i in _filtcaches().items()}
+
+
+def _filtcache_clear():
+    """Clear the filter caches and reset the hit/miss counters."""
+    for k in _filtcaches().values():
+        k.cache_clear()
+
+
+def _getBank(sf, f, npts, method, wltWidth, filtname, cycle, order, axis):
+    """Return the two functions of a filter-bank :
+    - prep(x) : forward transform of the signal, shared by all the bands
+    - band(xp, sl) : transform of the bands sl from the output of prep
+    The implemented filter-banks are :
+    - 'hilbert'
+    - 'fft'
+    - 'wavelet'
+    - 'multitaper'
+    """
+    # Hilbert method
+    if method == 'hilbert':
+        fDesign = [_getFiltDesign(sf, k, npts, filtname, cycle, order, axis)
+                   for k in f]
+
+        def hilprep(x):
+            return x
+
+        def hilbank(x, sl):
+            fD = fDesign[sl]
+            xF = np.zeros((len(fD),) + x.shape, dtype=x.dtype)
+            for k, fcn in enumerate(fD):
+                xF[k, ...] = fcn(x)
+            return _analytic(xF, axis=axis+1)
+        return hilprep, hilbank
+
+    # FFT filter-bank method
+    elif method == 'fft':
+        # Zero-padding / edges of the filter bank :
+        f = tuple((float(k[0]), float(k[1])) for k in f)
+        padlen = max([_filtPadlen(float(sf), k, npts, filtname, cycle, order)
+                      for k in f])
+        padlen = min(padlen, npts - 1)
+        nfft = next_fast_len(npts + 2 * padlen)
+        # Analytic zero-phase responses of all bands (nbands, nfft/2+1) :
+        resp = np.array([_fftResponse(float(sf), k, npts, filtname, cycle,
+                                      order, nfft) for k in f])
+
+        def fftprep(x):
+            return _fftBankPrep(x, padlen, nfft)
+
+        def fftbank(xp, sl):
+            return _fftBankApply(xp, resp[sl], padlen, nfft)
+        return fftprep, fftbank
+
+    # Wavelet method
+    elif method == 'wavelet':
+        fce = tuple(float((k[0] + k[1]) / 2) for k in f)
+        kernels, nfft = _morletBank(float(sf), fce, float(wltWidth), npts)
+
+        def wavprep(x):
+            return _fftForward(x, nfft)
+
+        def wavbank(xp, sl):
+            return _morletBankApply(xp, kernels[sl], sf)
+        return wavprep, wavbank
+
+    # Multitaper method
+    elif method == 'multitaper':
+        f = tuple((float(k[0]), float(k[1])) for k in f)
+        kernels, nfft, idx = _multitaperBank(float(sf), f, float(cycle), npts)
+
+        def mtprep(x):
+            return _fftForward(x, nfft)
+
+        def mtbank(xp, sl):
+            # Tapers of the bands sl :
+            bidx = np.append(idx, len(kernels))
+            i0, i1, _ = sl.indices(len(idx))
+            t0, t1 = bidx[i0], bidx[i1]
+            return _multitaperBankApply(xp, kernels[t0:t1], bidx[i0:i1] - t0)
+        return mtprep, mtbank
+
+
+####################################################################
+# - Streaming :
+####################################################################
+def _streamDesign(sf, f, filtname, cycle, order):
+    """Causal design of a band for the streaming mode.
+
+    The band is filtered with a causal filter ((b, a) or sos). The analytic
+    signal is then obtained with a complex FIR g, made of a delayed unit
+    impulse (real part) and of a Hilbert transformer (imaginary part).
+
+    Return b, a, sos, g and the latency (in samples). The latency is the
+    delay of g, plus the group delay of the linear-phase fir1 filter.
+    """
+    f = (float(f[0]), float(f[1]))
+    b, a, sos, fOrder = _filtCoefs(float(sf), f, np.inf, filtname, cycle,
+                                   order)
+    if sos is not None:
+        sos = sos.copy()
+    M = max(int(cycle * sf // (2 * f[0])), 1)
+    g = _hilbertFir(M)
+    latency = M + (fOrder // 2 if fOrder is not None else 0)
+    return b, a, sos, g, latency
+
+
+@lru_cache(maxsize=FILTCACHE_SIZE)
+def _hilbertFir(M):
+    """Complex FIR of length 2*M+1 whose output is the analytic signal of its
+    input, delayed by M samples (Hamming-windowed Hilbert transformer).
+    """
+    n = np.arange(-M, M + 1)
+    h = np.zeros((2 * M + 1,))
+    odd = n % 2 == 1
+    h[odd] = 2 / (np.pi * n[odd])
+    g = 1j * h * hamming(2 * M + 1)
+    g[M] += 1.
+    g.flags.writeable = False
+    return g
+
+
+def _streamInit(design, x0):
+    """Initial states of the filters of each band, for a first sample x0 of
+    shape (nchan,). The band-pass filter starts at steady state.
+    """
+    zi = []
+    for b, a, sos, g, _ in design:
+        if sos is not None:
+            z1 = sosfilt_zi(sos)[..., np.newaxis] * x0
+        else:
+            z1 = lfilter_zi(b, a)[:, np.newaxis] * x0[np.newaxis, :]
+        z2 = np.zeros((len(g) - 1, len(x0)), dtype=complex)
+        zi.append([z1, z2])
+    return zi
+
+
+def _streamApply(x, design, zi):
+    """Filter a block x of shape (nsamples, nchan) and update the states zi
+    (in place).
+
+    Return the analytic signal of each band (nbands, nsamples, nchan).
+    """
+    xa = np.zeros((len(design),) + x.shape, dtype=complex)
+    for k, (b, a, sos, g, _) in enumerate(design):
+        if sos is not None:
+            xb, zi[k][0] = sosfilt(sos, x, axis=0, zi=zi[k][0])
+        else:
+            xb, zi[k][0] = lfilter(b, a, x, axis=0, zi=zi[k][0])
+        xa[k, ...], zi[k][1] = lfilter(g, [1.], xb, axis=0, zi=zi[k][1])
+    return xa
+
+
+def _analytic(x, axis=0, dtype=None):
+    """Batched analytic signal of a real array along an axis.
+
+    The analytic signal is computed with a single real FFT, on the exact
+    length of the axis, so that the result is the same as the one of
+    scipy.signal.hilbert. Use dtype=np.complex64 to get a simple precision
+    output.
+    """
+    if dtype is not None:
+        x = x.astype(np.finfo(dtype).dtype, copy=False)
+    N = x.shape[axis]
+    xfft = rfft(x, axis=axis)
+    nh = xfft.shape[axis]
+    # Analytic-signal mask (x2 for positive frequencies) :
+    h = np.full((nh,), 2.)
+    h[0] = 1.
+    if N % 2 == 0:
+        h[-1] = 1.
+    sh = [1] * x.ndim
+    sh[axis] = nh
+    xfft *= h.reshape(sh)
+    return ifft(xfft, N, axis=axis, overwrite_x=True)
+
+
+def _filtPadlen(sf, f, npts, filtname, cycle, order):
+    """Padding length used by filtfilt for a designed filter.
+
+    The IIR filters use the default padding of filtfilt for the equivalent
+    (b, a) filter, i.e 3 * (2 * nsections + 1).
+    """
+    b, a, sos, fOrder = _filtCoefs(sf, f, npts, filtname, cycle, order)
+    return _coefsPadlen(sos, fOrder)
+
+
+def _coefsPadlen(sos, fOrder):
+    """Padding length of the fir1 order or of the second-order sections."""
+    if fOrder is not None:
+        return fOrder
+    return 3 * (2 * sos.shape[0] + 1)
+
+
+@lru_cache(maxsize=FILTCACHE_SIZE)
+def _fftResponse(sf, f, npts, filtname, cycle, order, nfft):
+    """Analytic zero-phase frequency response of a designed filter.
+
+    The response of a forward-backward filtering (|H|**2) is evaluated on the
+    nfft/2+1 positive frequencies. The analytic-signal mask (x2 for positive
+    frequencies) is folded in.
+    """
+    b, a, sos, _ = _filtCoefs(sf, f, npts, filtname, cycle, order)
+    if sos is not None:
+        h = np.prod(rfft(sos[:, 0:3], nfft, axis=1) /
+                    rfft(sos[:, 3::], nfft, axis=1), axis=0)
+    else:
+        h = rfft(b, nfft) / rfft(np.atleast_1d(a), nfft)
+    resp = np.abs(h) ** 2
+    resp[1:(nfft + 1) // 2] *= 2
+    resp.flags.writeable = False
+    return resp
+
+
+def _fftBankPrep(x, padlen, nfft):
+    """Forward transform of an analytic FFT filter-bank.
+
+    x : array of shape (npts, ntrials)
+    Return the real FFT of the padded signal and npts
+    """
+    npts = x.shape[0]
+    # Odd extension of the signal (same edges handling as filtfilt) :
+    if padlen > 0:
+        x = np.concatenate((2 * x[[0], ...] - x[padlen:0:-1, ...], x,
+                            2 * x[[-1], ...] - x[-2:-padlen - 2:-1, ...]))
+    # Single forward transform, shared by all bands :
+    return rfft(x, nfft, axis=0), npts
+
+
+def _fftBankApply(xp, resp, padlen, nfft):
+    """Apply an analytic FFT filter-bank.
+
+    xp : output of _fftBankPrep
+    resp : analytic responses of shape (nbands, nfft/2+1)
+    Return the analytic signal of each band (nbands, npts, ntrials)
+    """
+    xfft, npts = xp
+    nh = xfft.shape[0]
+    # Apply every band responses and inverse all the bands at once :
+    resp = resp.astype(xfft.real.dtype, copy=False)
+    xa = np.zeros((resp.shape[0], nfft) + xfft.shape[1:], dtype=xfft.dtype)
+    sl = (Ellipsis,) + (np.newaxis,) * (xfft.ndim - 1)
+    xa[:, 0:nh, ...] = resp[sl] * xfft
+    xa = ifft(xa, axis=1, overwrite_x=True)
+    return xa[:, padlen:padlen + npts, ...]
 
 
 def _getTransform(sf, f, npts, method, wltWidth, *arg):
     """Return a fuction which contain a transformation
-    - 'hilbert'
     - 'hilbert1'
     - 'hilbert2'
-    - 'wavelet'
+    - 'filter'
     """
     # Get the design of the filter :
     fDesign = _getFiltDesign(sf, f, npts, *arg)
 
-    # Hilbert method
-    if method == 'hilbert':
-        def hilb(x):
-            xH = np.zeros(x.shape)*1j
-            xF = fDesign(x)
-            for k in range(x.shape[1]):
-                xH[:, k] = hilbert(xF[:, k])
-            return xH
-        return hilb
-
     # Hilbert method 1
-    elif method == 'hilbert1':
+    if method == 'hilbert1':
         def hilb1(x): return hilbert(fDesign(x))
         return hilb1
 
@@ -109,11 +486,6 @@ def _getTransform(sf, f, npts, method, wltWidth, *arg):
         def hilb2(x): return hilbert2(fDesign(x))
         return hilb2
 
-    # Wavelet method
-    elif method == 'wavelet':
-        def wav(x): return morlet(x, sf, (f[0]+f[1])/2, wavelet_width=wltWidth)
-        return wav
-
     # Filter the signal
     elif method == 'filter':
         def fm(x): return fDesign(x)
@@ -127,9 +499,10 @@ def _getKind(kind):
     - 'phase' : phase of the signal
     - 'amplitude' : amplitude of the signal
     - 'power' : power of the signal
+    - 'analytic' : complex analytic signal
     """
     # Unmodified signal
-    if kind == 'signal':
+    if kind in ['signal', 'analytic']:
         def sig_k(x): return x
         return sig_k
 
@@ -277,20 +650,149 @@ def fir_filt(x, Fs, Fc, fOrder):
 # - Morlet :
 ####################################################################
 def morlet(x, Fs, f, wavelet_width=7):
+    kernels, nfft = _morletBank(float(Fs), (float(f),), float(wavelet_width),
+                                x.shape[0])
+    return np.abs(_morletBankApply(_fftForward(x, nfft), kernels, Fs)[0, ...])
+
+
+@lru_cache(maxsize=FILTCACHE_SIZE)
+def _morletBank(Fs, fce, wavelet_width, npts):
+    """Build the FFT of a bank of complex Morlet wavelets.
+
+    Each kernel is circularly shifted so that the 'same' part of the linear
+    convolution start at the first sample of the inverse FFT.
+
+    Return the kernels of shape (nfce, nfft) and nfft.
+    """
     dt = 1/Fs
-    sf = f/wavelet_width
-    st = 1/(2*np.pi*sf)
-    N, nepoch = x.shape
+    wav = []
+    for f in fce:
+        sf = f/wavelet_width
+        st = 1/(2*np.pi*sf)
+        t = np.arange(-3.5*st, 3.5*st, dt)
+        A = 1/(st*np.sqrt(np.pi))**(1/2)
+        m = A*np.exp(-np.square(t)/(2*st**2))*np.exp(1j*2*np.pi*f*t)
+        wav.append(m)
+    nfft = next_fast_len(npts + max([len(m) for m in wav]) - 1)
+
+    kernels = np.zeros((len(wav), nfft), dtype=complex)
+    for k, m in enumerate(wav):
+        kernels[k, 0:len(m)] = m
+        kernels[k, :] = np.roll(kernels[k, :], -(int(np.ceil(len(m)/2))-1))
+    kernels = fft(kernels, axis=1)
+    kernels.flags.writeable = False
+
+    return kernels, nfft
+
+
+def _morletBankApply(xp, kernels, Fs):
+    """Convolve a signal with a bank of Morlet wavelets.
+
+    xp : output of _fftForward
+    kernels : FFT of the wavelets of shape (nfce, nfft)
+    Return the complex coefficients of shape (nfce, npts, ntrials)
+    """
+    return 2*_fftConvolve(xp, kernels)/Fs
+
 
-    t = np.arange(-3.5*st, 3.5*st, dt)
+def _fftForward(x, nfft):
+    """FFT of a real x (npts, ntrials), computed once for all the kernels.
+
+    Return the full (hermitian completed) FFT and npts
+    """
+    xfft = rfft(x, nfft, axis=0)
+    nh = xfft.shape[0]
+    # Hermitian completion (the kernels are complex) :
+    return np.concatenate((xfft, np.conj(xfft[nfft-nh:0:-1, ...]))), x.shape[0]
 
-    A = 1/(st*np.sqrt(np.pi))**(1/2)
-    m = A*np.exp(-np.square(t)/(2*st**2))*np.exp(1j*2*np.pi*f*t)
 
-    xMorlet = np.zeros((N, nepoch))
-    for k in range(0, nepoch):
-        y = 2*np.abs(np.convolve(x[:, k], m))/Fs
-        xMorlet[:, k] = y[int(np.ceil(len(m)/2))-1:int(len(y)-np.floor(
-            len(m)/2))]
+def _fftConvolve(xp, kernels):
+    """'Same' convolution of a real signal with a bank of complex kernels.
+
+    xp : output of _fftForward
+    kernels : FFT of the centered kernels of shape (nkernels, nfft)
+    Return the complex convolutions of shape (nkernels, npts, ntrials)
+    """
+    xfft, npts = xp
+    # Batched convolution of all trials and kernels :
+    kernels = kernels.astype(xfft.dtype, copy=False)
+    sl = (Ellipsis,) + (np.newaxis,) * (xfft.ndim - 1)
+    return ifft(kernels[sl] * xfft, axis=1, overwrite_x=True)[:, 0:npts, ...]
 
-    return xMorlet
+
+####################################################################
+# - Multitaper :
+####################################################################
+@lru_cache(maxsize=FILTCACHE_SIZE)
+def _dpss(npts, NW):
+    """DPSS (Slepian) tapers of shape (ntapers, npts).
+
+    The number of tapers is 2*NW-1 (at least one). The tapers have a unit
+    energy and are cached per (npts, NW).
+    """
+    K = max(1, int(2*NW) - 1)
+    tapers = np.atleast_2d(dpss(npts, NW, K))
+    tapers.flags.writeable = False
+    return tapers
+
+
+def _mtParams(Fs, f, cycle, npts):
+    """Length of the tapers and time half-bandwidth product of a band.
+
+    The tapers last cycle cycles of the lowest frequency (like the fir1
+    order) and the bandwidth is the one of the band. The length is odd so
+    that the tapers are centered on a sample.
+    """
+    n = int(min(max(np.floor(cycle*Fs/f[0]), 3), npts))
+    n -= 1 - n % 2
+    NW = max(n*(f[1] - f[0])/(2*Fs), 1.)
+    return n, NW
+
+
+@lru_cache(maxsize=FILTCACHE_SIZE)
+def _multitaperBank(Fs, f, cycle, npts):
+    """Build the FFT of a bank of DPSS tapers modulated at the center of
+    each band.
+
+    The kernels of a band are scaled so that the multitaper amplitude of a
+    sinusoid at the center frequency equals its amplitude.
+
+    Return the kernels of shape (ntapers, nfft), nfft and the index of the
+    first taper of each band.
+    """
+    kern, idx = [], []
+    for k in f:
+        n, NW = _mtParams(Fs, k, cycle, npts)
+        tapers = _dpss(n, NW)
+        t = (np.arange(n) - (n - 1)/2)/Fs
+        scale = 2*np.sqrt(len(tapers)/np.sum(tapers.sum(1)**2))
+        idx.append(len(kern))
+        kern.extend(scale*tapers*np.exp(1j*2*np.pi*np.mean(k)*t))
+    nfft = next_fast_len(npts + max([len(m) for m in kern]) - 1)
+
+    kernels = np.zeros((len(kern), nfft), dtype=complex)
+    for k, m in enumerate(kern):
+        kernels[k, 0:len(m)] = m
+        kernels[k, :] = np.roll(kernels[k, :], -(int(np.ceil(len(m)/2))-1))
+    kernels = fft(kernels, axis=1)
+    kernels.flags.writeable = False
+
+    return kernels, nfft, np.array(idx)
+
+
+def _multitaperBankApply(xp, kernels, idx):
+    """Multitaper estimation of all the bands.
+
+    xp : output of _fftForward
+    Return a complex array of shape (nbands, npts, ntrials). The modulus is
+    the multitaper amplitude (taper averaged power) and the phase is the one
+    of the first taper.
+    """
+    xt = _fftConvolve(xp, kernels)
+    # Number of tapers of each band :
+    ntap = np.diff(np.append(idx, len(kernels))).reshape(-1, 1, 1)
+    amp = np.sqrt(np.add.reduceat(np.square(np.abs(xt)), idx, axis=0)/ntap)
+    xt = xt[idx, ...]
+    mod = np.abs(xt)
+    mod[mod == 0] = 1.
+    return amp * xt / mod
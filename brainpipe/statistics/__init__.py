@@ -1,6 +1,6 @@
 from .binomial import (bino_da2p, bino_p2da, bino_signifeat)  # noqa
-from .permutations import (perm_rndDatasets, perm_swap, perm_array, perm_rep,  # noqa
-                           perm_metric, perm_2pvalue, permIntraClass,
+from .permutations import (perm_rndDatasets, perm_swap, perm_swapidx,  # noqa
+                           perm_array, perm_rep, perm_metric, perm_2pvalue, permIntraClass,
                            perm_pvalue2level)
 from .multcomp import (bonferroni, fdr, maxstat)  # noqa
 from .circstat import (circ_corrcc, circ_r, circ_rtest)  # noqa
\ No newline at end of file
@@ -3,7 +3,7 @@ from scipy.stats import pearsonr, chi2
 
 __all__ = ['circ_corrcc', 'circ_r', 'circ_rtest']
 
-def circ_corrcc(alpha, x):
+def circ_corrcc(alpha, x, axis=None):
     """Correlation coefficient between one circular and one linear random
     variable.
     
@@ -14,6 +14,13 @@ def circ_corrcc(alpha, x):
         x: vector
             Sample of linear random variable
 
+    Kargs:
+        axis: int, optional, [def: None]
+            Correlate along this dimension. alpha and x are broadcasted and
+            all the correlations are computed at once. The coefficients and
+            p-values have the broadcasted shape without this dimension. If
+            None, alpha and x are considered as vectors.
+
     Returns:
         rho: float
             Correlation coefficient
@@ -25,14 +32,24 @@ def circ_corrcc(alpha, x):
     By Philipp Berens, 2009
     Python adaptation by Etienne Combrisson
     """
-    if len(alpha) is not len(x):
-        raise ValueError('The length of alpha and x must be the same')
-    n = len(alpha)
+    if axis is not None:
+        alpha, x = np.asarray(alpha), np.asarray(x)
+        n = np.broadcast_shapes(alpha.shape, x.shape)[axis]
+        sa, ca = np.sin(alpha), np.cos(alpha)
+
+        # Compute correlation coefficent for sin and cos independently
+        rxs = _corr(x, sa, axis)
+        rxc = _corr(x, ca, axis)
+        rcs = _corr(sa, ca, axis)
+    else:
+        if len(alpha) is not len(x):
+            raise ValueError('The length of alpha and x must be the same')
+        n = len(alpha)
 
-    # Compute correlation coefficent for sin and cos independently
-    rxs = pearsonr(x,np.sin(alpha))[0]
-    rxc = pearsonr(x,np.cos(alpha))[0]
-    rcs = pearsonr(np.sin(alpha),np.cos(alpha))[0]
+        # Compute correlation coefficent for sin and cos independently
+        rxs = pearsonr(x,np.sin(alpha))[0]
+        rxc = pearsonr(x,np.cos(alpha))[0]
+        rcs = pearsonr(np.sin(alpha),np.cos(alpha))[0]
 
     # Compute angular-linear correlation (equ. 27.47)
     rho = np.sqrt((rxc**2 + rxs**2 - 2*rxc*rxs*rcs)/(1-rcs**2));
@@ -43,6 +60,15 @@ def circ_corrcc(alpha, x):
     return rho, pval
 
 
+def _corr(a, b, axis):
+    """Pearson correlation coefficients of a and b along an axis
+    """
+    a = a - a.mean(axis=axis, keepdims=True)
+    b = b - b.mean(axis=axis, keepdims=True)
+    return (a*b).sum(axis=axis) / np.sqrt(
+        (a**2).sum(axis=axis) * (b**2).sum(axis=axis))
+
+
 def circ_r(alpha, w=None, d=0, axis=0):
     """Computes mean resultant vector length for circular data.
 
@@ -75,16 +101,17 @@ def circ_r(alpha, w=None, d=0, axis=0):
 #         if alpha.shape[0] is not 1:
 #             alpha = alpha
     
+    # Compute (weighted) sum of cos and sin of angles and obtain length
+    # (no complex array is built) :
     if w is None:
-        w = np.ones(alpha.shape)
-    elif (alpha.size is not w.size):
+        r = np.hypot(np.cos(alpha).sum(axis=axis),
+                     np.sin(alpha).sum(axis=axis))/alpha.shape[axis]
+    elif (alpha.size != w.size):
         raise ValueError("Input dimensions do not match")
-
-    # Compute weighted sum of cos and sin of angles:
-    r = np.multiply(w, np.exp(1j*alpha)).sum(axis=axis)
-
-    # Obtain length:
-    r = np.abs(r)/w.sum(axis=axis)
+    else:
+        r = np.hypot(np.multiply(w, np.cos(alpha)).sum(axis=axis),
+                     np.multiply(w, np.sin(alpha)).sum(axis=axis))
+        r = r/w.sum(axis=axis)
 
     # For data with known spacing, apply correction factor to
     # correct for bias in the estimation of r
@@ -95,7 +122,7 @@ def circ_r(alpha, w=None, d=0, axis=0):
     return np.array(r)
 
 
-def circ_rtest(alpha, w=None, d=0):
+def circ_rtest(alpha, w=None, d=0, axis=None):
     """Computes Rayleigh test for non-uniformity of circular data.
     H0: the population is uniformly distributed around the circle
     HA: the populatoin is not distributed uniformly around the circle
@@ -115,24 +142,45 @@ def circ_rtest(alpha, w=None, d=0):
             correction factor is used to correct for bias in
             estimation of r
 
+        axis: int, optional, [def: None]
+            Test along this dimension. All the tests are computed at once and
+            the p-values and statistics have the shape of alpha without
+            this dimension. If None, alpha is considered as a single sample
+            (or as a column vector for 2D arrays).
+
+    Return:
+        pval: p-value(s) of Rayleigh's test
+
+        z: value(s) of the z-statistic
+
     Code taken from the Circular Statistics Toolbox for Matlab
     By Philipp Berens, 2009
     Python adaptation by Etienne Combrisson
     """
-    alpha = np.array(alpha)
-    if alpha.ndim == 1:
-        alpha = np.matrix(alpha)
-    if alpha.shape[1] > alpha.shape[0]:
-        alpha = alpha.T
-
-    if w is None:
-        r = circ_r(alpha)
-        n = len(alpha)
+    # Vectorized test along an axis :
+    if axis is not None:
+        alpha = np.asarray(alpha)
+        if w is None:
+            r = circ_r(alpha, axis=axis)
+            n = alpha.shape[axis]
+        else:
+            r = circ_r(alpha, w, d, axis=axis)
+            n = np.asarray(w).sum(axis=axis)
     else:
-        if len(alpha) is not len(w):
-            raise ValueError("Input dimensions do not match")
-        r = circ_r(alpha, w, d)
-        n = w.sum()
+        alpha = np.array(alpha)
+        if alpha.ndim == 1:
+            alpha = np.matrix(alpha)
+        if alpha.shape[1] > alpha.shape[0]:
+            alpha = alpha.T
+
+        if w is None:
+            r = circ_r(alpha)
+            n = len(alpha)
+        else:
+            if len(alpha) != len(w):
+                raise ValueError("Input dimensions do not match")
+            r = circ_r(alpha, w, d)
+            n = w.sum()
 
     # Compute Rayleigh's
     R = n*r
@@ -143,5 +191,8 @@ def circ_rtest(alpha, w=None, d=0):
     # Compute p value using approxation in Zar, p. 617
     pval = np.exp(np.sqrt(1+4*n+4*(n**2-R**2))-(1+2*n))
 
+    # Keep the singleton dimensions of a vectorized test :
+    if axis is not None:
+        return pval, z
     return np.squeeze(pval), np.squeeze(z)
     
\ No newline at end of file
@@ -1,5 +1,4 @@
 import numpy as np
-from itertools import product
 from types import FunctionType
 
 from .multcomp import maxstat
@@ -7,6 +6,7 @@ from ..tools import uorderlst
 
 __all__ = ["perm_rndDatasets",
            "perm_swap",
+           "perm_swapidx",
            "perm_array",
            "perm_rep",
            "perm_metric",
@@ -54,16 +54,12 @@ def perm_2pvalue(data, perm, n_perm, threshold=None, tail=2):
         raise ValueError('perm must have a shape of'
                          ' '+str(tuple([n_perm]+list(dsh)))+' instead of '+str(perm.shape))
 
-    # Loop on data values :
-    dataLoop = product(*tuple([range(k) for k in data.shape]))
-
     # Get the permutation function :
     fcn = _tailfcn(perm, n_perm, tail)
 
-    # Apply the function :
+    # Apply the function to all the data values at once :
     pval = np.ones(data.shape)
-    for k in dataLoop:
-        pval[k] = fcn(perm[(np.arange(n_perm), *k)], data[k], n_perm)
+    pval[...] = fcn(np.asarray(perm), np.asarray(data), n_perm)
 
     # Replace 0 by /n_perm :
     pval[np.where(pval == 0)] = 1/n_perm
@@ -77,16 +73,19 @@ def perm_2pvalue(data, perm, n_perm, threshold=None, tail=2):
 
 def permtail(perm, data, n_perm, tail=2):
     """Compute p-values from either superior or inferior part of the distribution.
+
+    The permutations are along the first axis of perm, so that data can be
+    an array (p-values of all the values are computed at once).
     """
     # One tail (lower) :
     if tail == -1:
-        return (np.sum(perm <= data)) / n_perm
+        return (np.sum(perm <= data, axis=0)) / n_perm
     # One tail (upper) :
     elif tail == 1:
-        return (np.sum(perm >= data)) / n_perm
+        return (np.sum(perm >= data, axis=0)) / n_perm
     # Two tails :
     elif tail == 2:
-        return (np.sum(np.abs(perm) >= np.abs(data))) / n_perm
+        return (np.sum(np.abs(perm) >= np.abs(data), axis=0)) / n_perm
 
 
 def _tailfcn(perm, n_perm, tail):
@@ -208,16 +207,35 @@ def perm_swap(a, b, n_perm=200, axis=-1, rndstate=0):
 def _swap(ab_backup, n_perm, rndstate):
     """Sub Swapping function
     """
-    absh_mat = np.zeros(tuple([n_perm]+list(ab_backup.shape)))
+    return ab_backup[perm_swapidx(ab_backup.shape[0], n_perm, rndstate), ...]
+
+
+def perm_swapidx(n, n_perm=200, rndstate=0):
+    """Get the indices used by perm_swap to shuffle n values.
+
+    The permutation k is the one of the random state rndstate+k. Hence,
+    indexing the concatenation of a and b with these indices along the
+    swapping axis gives the same result as perm_swap.
+
+    Args:
+        n: int
+            Number of values to shuffle
+
+    Kargs:
+        n_perm: int, optional, [def: 200]
+            Number of permutations
+
+        rndstate: int, optional, [def: 0]
+            Fix the random state of the machine
+
+    Return:
+        idx: array
+            Indices of shape (n_perm, n)
+    """
+    idx = np.zeros((n_perm, n), dtype=int)
     for k in range(n_perm):
-        # Backup of ab :
-        ab = ab_backup.copy()
-        # New random state :
-        rnd = np.random.RandomState(rndstate+k)
-        # Shuffle copy :
-        rnd.shuffle(ab)
-        absh_mat[k, ...] = ab
-    return absh_mat
+        idx[k, :] = np.random.RandomState(rndstate+k).permutation(n)
+    return idx
 
 
 def perm_array(x, n_perm=200, rndstate=0):
@@ -1,4 +1,5 @@
 from .bpstudy import Study  # noqa
 from .dataframe import pdTools  # noqa
 from .logging import set_log_level, progress_bar  # noqa
-from .bpstudy import Study  # noqa
\ No newline at end of file
+from .bpstudy import Study  # noqa
+from .cache import set_cache, cache_clear  # noqa
@@ -0,0 +1,259 @@
+"""Persistent on-disk cache of feature and coupling computations.
+
+The cache is disabled by default. Once enabled with set_cache, the results of
+the decorated get() methods are saved on disk. The key of each result is a
+hash of the input arrays, of the parameters of the object (listed in its
+_cacheattr attribute) and of the arguments of the call. The attributes set by
+get() (listed in _cachestate) are saved with the result and restored when the
+result is loaded. Cached arrays are loaded as copy-on-write memory-mapped
+arrays. The least recently used results are removed when the cache is full.
+"""
+import os
+import pickle
+import hashlib
+import logging
+import inspect
+from functools import wraps
+from shutil import rmtree
+
+import numpy as np
+
+logger = logging.getLogger('brainpipe')
+
+__all__ = ['set_cache', 'cache_clear', 'cached']
+
+# Path and maximum size (in bytes) of the cache :
+_CACHE = {'path': None, 'max_size': None}
+
+# Arguments which do not change the result of a computation :
+_IGNORE = ['self', 'n_jobs', 'max_memory']
+
+# Number of bytes of an array-like hashed at once :
+_HASHCHUNK = 2**26
+
+# Types hashed with their representation :
+_SCALAR = (str, bytes, int, float, complex, bool, type(None), np.generic,
+           np.dtype)
+
+
+def set_cache(path=None, max_size=None):
+    """Enable (or disable) the on-disk cache of features.
+
+    Kargs:
+        path: string, optional, [def: None]
+            Folder where to save the results. If None, the cache is
+            disabled.
+
+        max_size: int, optional, [def: None]
+            Maximum size of the cache (in bytes). When the cache is full, the
+            least recently used results are removed. If None, the size of the
+            cache is not bounded.
+    """
+    if path is not None:
+        path = os.path.abspath(os.path.expanduser(path))
+        os.makedirs(path, exist_ok=True)
+        logger.info("Features are cached in %s" % path)
+    _CACHE['path'], _CACHE['max_size'] = path, max_size
+    if path is not None:
+        _evict()
+
+
+def cache_clear():
+    """Remove every results of the cache."""
+    path = _CACHE['path']
+    if path is None:
+        return
+    for k in os.listdir(path):
+        if os.path.isdir(os.path.join(path, k)):
+            rmtree(os.path.join(path, k))
+
+
+def cached(fcn):
+    """Cache the outputs of a get() method (decorator).
+
+    The class of the object must define _cacheattr, the list of the
+    attributes which change the result, and _cachestate, the list of the
+    attributes set by get(). The call is directly executed if the cache is
+    disabled, if an 'out' argument is provided or if an argument can not be
+    hashed.
+    """
+    sig = inspect.signature(fcn)
+
+    @wraps(fcn)
+    def wrapper(self, *args, **kwargs):
+        if _CACHE['path'] is None:
+            return fcn(self, *args, **kwargs)
+        if not hasattr(self, '_cacheattr') or not hasattr(self,
+                                                          '_cachestate'):
+            raise TypeError(type(self).__name__+" must define _cacheattr and"
+                            " _cachestate to be cached")
+        # Normalized arguments of the call :
+        bound = sig.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        if bound.arguments.get('out', None) is not None:
+            return fcn(self, *args, **kwargs)
+        callargs = {k: i for k, i in bound.arguments.items()
+                    if k not in _IGNORE}
+        # Key of the result :
+        h = hashlib.blake2b(digest_size=20)
+        try:
+            _hash(h, fcn.__qualname__)
+            _hash(h, self)
+            _hash(h, callargs)
+        except TypeError as e:
+            logger.debug("%s is not cached (%s)" % (fcn.__qualname__, e))
+            return fcn(self, *args, **kwargs)
+        folder = os.path.join(_CACHE['path'], h.hexdigest())
+        # Load the result and restore the attributes set by get() :
+        if os.path.isfile(os.path.join(folder, 'meta.pkl')):
+            try:
+                out, state = _load(folder)
+                os.utime(folder)
+                logger.debug("Cache hit for %s" % fcn.__qualname__)
+                for k, i in state.items():
+                    setattr(self, k, i)
+                return out
+            except Exception:
+                rmtree(folder, ignore_errors=True)
+        # Compute and save the result :
+        out = fcn(self, *args, **kwargs)
+        try:
+            _save(folder, out, {k: getattr(self, k, None)
+                                for k in self._cachestate})
+        except Exception as e:
+            logger.debug("%s is not cached (%s)" % (fcn.__qualname__, e))
+            rmtree(folder, ignore_errors=True)
+            return out
+        _evict()
+        return out
+
+    return wrapper
+
+
+def _hash(h, obj):
+    """Recursively update the hash h with obj.
+
+    Raise a TypeError if obj (or one of its items) can not be hashed.
+    """
+    if isinstance(obj, np.ndarray) and (obj.dtype == object):
+        h.update(str((obj.dtype.str, obj.shape)).encode())
+        for k in obj.ravel():
+            _hash(h, k)
+    elif hasattr(obj, 'shape') and hasattr(obj, 'dtype'):
+        # Arrays and array-likes (memmap, HDF5 datasets...) :
+        _hashArray(h, obj)
+    elif isinstance(obj, dict):
+        h.update(b'dict')
+        for k in sorted(obj, key=str):
+            _hash(h, k)
+            _hash(h, obj[k])
+    elif isinstance(obj, (list, tuple)):
+        h.update(type(obj).__name__.encode())
+        for k in obj:
+            _hash(h, k)
+    elif isinstance(obj, slice):
+        _hash(h, ('slice', obj.start, obj.stop, obj.step))
+    elif isinstance(obj, _SCALAR):
+        h.update(type(obj).__name__.encode())
+        h.update(repr(obj).encode())
+    elif hasattr(obj, '_cacheattr'):
+        # Parameters of brainpipe objects (e.g. fextract) :
+        h.update(type(obj).__name__.encode())
+        _hash(h, {k: getattr(obj, k, None) for k in obj._cacheattr})
+    elif callable(obj) and hasattr(obj, '__qualname__'):
+        # Only module-level named functions are identified by their name :
+        if ('<lambda>' in obj.__qualname__) or (
+                '<locals>' in obj.__qualname__) or getattr(
+                obj, '__closure__', None):
+            raise TypeError("can not hash the anonymous or local function " +
+                            obj.__qualname__)
+        h.update((obj.__module__ + '.' + obj.__qualname__).encode())
+    else:
+        raise TypeError("can not hash an object of type " +
+                        type(obj).__name__)
+
+
+def _hashArray(h, obj):
+    """Update the hash h with an array-like, by chunks along the first axis.
+
+    Only one chunk of a memory-mapped array or of an HDF5 dataset is loaded
+    in memory at once.
+    """
+    shape = tuple(obj.shape)
+    h.update(str((np.dtype(obj.dtype).str, shape)).encode())
+    if len(shape) == 0:
+        h.update(np.ascontiguousarray(obj[()]).reshape(-1).view(np.uint8).data)
+        return
+    nbytes = np.dtype(obj.dtype).itemsize * int(np.prod(shape[1::]))
+    step = max(1, _HASHCHUNK // max(1, nbytes))
+    for k in range(0, shape[0], step):
+        chunk = np.ascontiguousarray(obj[k:k+step])
+        h.update(chunk.reshape(-1).view(np.uint8).data)
+
+
+def _save(folder, out, state):
+    """Save the output of a function and the attributes it set in a folder.
+    """
+    os.makedirs(folder, exist_ok=True)
+    arrays = []
+
+    def _replace(obj):
+        if isinstance(obj, np.ndarray) and (obj.dtype != object):
+            arrays.append(obj)
+            return ('__npy__', len(arrays) - 1)
+        elif isinstance(obj, dict):
+            return {k: _replace(i) for k, i in obj.items()}
+        elif isinstance(obj, (list, tuple)):
+            return type(obj)(_replace(k) for k in obj)
+        return obj
+
+    meta = (_replace(out), state)
+    for k, arr in enumerate(arrays):
+        np.save(os.path.join(folder, str(k) + '.npy'), arr)
+    # The meta file is written last (a result without it is incomplete) and
+    # moved into place once complete :
+    tmp = os.path.join(folder, 'meta.pkl.tmp')
+    with open(tmp, 'wb') as f:
+        pickle.dump(meta, f)
+    os.replace(tmp, os.path.join(folder, 'meta.pkl'))
+
+
+def _load(folder):
+    """Load a result, with copy-on-write memory-mapped arrays, and the
+    attributes set by the function."""
+    with open(os.path.join(folder, 'meta.pkl'), 'rb') as f:
+        meta, state = pickle.load(f)
+
+    def _restore(obj):
+        if isinstance(obj, tuple) and (len(obj) == 2) and (
+                obj[0] == '__npy__'):
+            return np.load(os.path.join(folder, str(obj[1]) + '.npy'),
+                           mmap_mode='c')
+        elif isinstance(obj, dict):
+            return {k: _restore(i) for k, i in obj.items()}
+        elif isinstance(obj, (list, tuple)):
+            return type(obj)(_restore(k) for k in obj)
+        return obj
+
+    return _restore(meta), state
+
+
+def _evict():
+    """Remove the least recently used results if the cache is full."""
+    path, max_size = _CACHE['path'], _CACHE['max_size']
+    if max_size is None:
+        return
+    entries = []
+    for k in os.listdir(path):
+        folder = os.path.join(path, k)
+        if not os.path.isdir(folder):
+            continue
+        size = sum([os.path.getsize(os.path.join(folder, i))
+                    for i in os.listdir(folder)])
+        entries.append((os.path.getmtime(folder), size, folder))
+    total = sum([k[1] for k in entries])
+    for _, size, folder in sorted(entries):
+        if total <= max_size:
+            break
+        rmtree(folder, ignore_errors=True)
+        total -= size
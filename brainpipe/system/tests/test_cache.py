@@ -0,0 +1,77 @@
+"""Test the on-disk cache of features."""
+import os
+
+import numpy as np
+
+from brainpipe.feature import power, pac
+from brainpipe.system import set_cache, cache_clear
+from brainpipe.system import cache
+
+
+class TestCache(object):  # noqa
+
+    sf, npts = 512., 1000
+
+    def _generate_array(self, n_elec=2, n_trials=10):
+        return np.random.RandomState(0).rand(n_elec, self.npts, n_trials)
+
+    def test_cache(self, tmpdir):  # noqa
+        x = self._generate_array()
+        path = str(tmpdir.join('cache'))
+        pw = power(self.sf, self.npts, f=[[2, 4], [60, 200]], width=100,
+                   step=50)
+        ref = pw.get(x, n_jobs=1)[0]
+        set_cache(path)
+        try:
+            xf = pw.get(x, n_jobs=1)[0]
+            assert len(os.listdir(path)) == 1
+            # Memory-mapped result of the cache :
+            xc, pv = pw.get(x, n_jobs=1)
+            assert isinstance(xc, np.memmap) and (pv is None)
+            np.testing.assert_array_equal(xc, ref)
+            np.testing.assert_array_equal(xf, ref)
+            # Cached results can be modified in place (copy-on-write) :
+            xc /= 2
+            np.testing.assert_array_equal(pw.get(x, n_jobs=1)[0], ref)
+            # Different data, parameters or arguments :
+            pw.get(x[:, :, :5], n_jobs=1)
+            power(self.sf, self.npts, f=[[2, 4]]).get(x, n_jobs=1)
+            pw.get(x, n_jobs=1, statmeth='wilcoxon')
+            assert len(os.listdir(path)) == 4
+            # Memory-mapped inputs are hashed by chunks (same key) :
+            np.save(str(tmpdir.join('x.npy')), x)
+            xm = np.load(str(tmpdir.join('x.npy')), mmap_mode='r')
+            hashchunk, cache._HASHCHUNK = cache._HASHCHUNK, 1000
+            try:
+                pw.get(xm, n_jobs=1)
+            finally:
+                cache._HASHCHUNK = hashchunk
+            assert len(os.listdir(path)) == 4
+            # Coupling :
+            obj = pac(self.sf, self.npts, Id='100', pha_f=[2, 4],
+                      amp_f=[60, 200])
+            xp = obj.get(x, x, n_perm=5, n_jobs=1)
+            xpc = obj.get(x, x, n_perm=5, n_jobs=1)
+            for k, i in zip(xp, xpc):
+                np.testing.assert_array_equal(k, i)
+            # Attributes set by get() are restored from the cache :
+            obj = pac(self.sf, self.npts, Id='100', pha_f=[2, 4],
+                      amp_f=[60, 200])
+            obj.get(x, x, n_perm=5, n_jobs=1)
+            assert (obj.n_perm == 5) and (obj.p == 1 / 5)
+            # Anonymous functions are not cached :
+            nfolder = len(os.listdir(path))
+            pw.get(x, n_jobs=1, statmeth='permutation', n_perm=5,
+                   metric=lambda a, b: a - b)
+            pw.get(x, n_jobs=1, statmeth='permutation', n_perm=5,
+                   metric=lambda a, b: a + b)
+            assert len(os.listdir(path)) == nfolder
+            assert pw._metric(2, 1) == 3
+            # Least recently used results are removed :
+            set_cache(path, max_size=1)
+            pw.get(x, n_jobs=1)
+            assert len(os.listdir(path)) <= 1
+            cache_clear()
+            assert len(os.listdir(path)) == 0
+        finally:
+            set_cache(None)
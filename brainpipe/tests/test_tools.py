@@ -0,0 +1,27 @@
+"""Test brainpipe tools."""
+import numpy as np
+
+from brainpipe.tools import binarize, binArray
+
+
+class TestTools(object):  # noqa
+
+    def _binarray_loop(self, x, binList, axis=0):
+        x = np.swapaxes(x, 0, axis)
+        xbin = np.array([x[k[0]:k[1], ...].mean(0) for k in binList])
+        return np.swapaxes(xbin, 0, axis)
+
+    def test_binarray(self):  # noqa
+        x = np.random.RandomState(0).rand(5, 400, 20)
+        # Overlapping (cumulative sum), disjoint and uneven windows :
+        windows = [binarize(0, 400, 50, 1), binarize(0, 400, 50, 50),
+                   [(0, 1), (3, 90), (50, 51), (10, 200), (5, 400)]]
+        for w in windows:
+            for axis in [1, 2]:
+                xbin, center = binArray(x, w, axis=axis)
+                np.testing.assert_allclose(xbin, self._binarray_loop(x, w,
+                                                                     axis))
+                assert len(center) == len(w)
+        # Precision is preserved :
+        assert binArray(x.astype(np.float32), windows[0],
+                        axis=1)[0].dtype == np.float32
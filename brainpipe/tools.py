@@ -57,16 +57,35 @@ def binArray(x, binList, axis=0):
         Binarize along the axis "axis"
 
     -> Return the binarize x and the center of each window.
+
+    Overlapping windows are averaged in a single vectorized pass using the
+    cumulative sum of x along axis, so the cost does not depend on the
+    number of windows.
     """
     nbin = len(binList)
-    x = np.swapaxes(x, 0, axis)
-
-    xBin = np.zeros((nbin,)+x.shape[1::])
-    for k, i in enumerate(binList):
-        if i[1] - i[0] == 1:
-            xBin[k, ...] = x[i[0], ...]
-        else:
-            xBin[k, ...] = np.mean(x[i[0]:i[1], ...], 0)
+    x = np.swapaxes(np.asarray(x), 0, axis)
+    dtype = np.result_type(x.dtype, np.float32)
+    idx = np.asarray(binList, dtype=int).reshape(nbin, 2)
+    # Windows out of the array are truncated (as slices are) :
+    idx = np.clip(idx, 0, x.shape[0])
+    width = idx[:, 1] - idx[:, 0]
+
+    # Overlapping windows -> cumulative sum :
+    if width.sum() > x.shape[0]:
+        acc = np.result_type(dtype, np.float64)
+        csum = np.zeros((x.shape[0]+1,)+x.shape[1::], dtype=acc)
+        np.cumsum(x, axis=0, dtype=acc, out=csum[1::, ...])
+        width = width.reshape((nbin,)+(1,)*(x.ndim-1))
+        xBin = ((csum[idx[:, 1], ...] - csum[idx[:, 0], ...]) / width)
+        xBin = xBin.astype(dtype, copy=False)
+    # Disjoint windows -> mean of each slice :
+    else:
+        xBin = np.zeros((nbin,)+x.shape[1::], dtype=dtype)
+        for k, i in enumerate(idx):
+            if i[1] - i[0] == 1:
+                xBin[k, ...] = x[i[0], ...]
+            else:
+                xBin[k, ...] = np.mean(x[i[0]:i[1], ...], 0)
 
     return np.swapaxes(xBin, 0, axis), [(k[0]+k[1])/2 for k in binList]
 
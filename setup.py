@@ -13,9 +13,10 @@ setup(
     packages=find_packages(),
     description='Bridge between neural signal datasets and machine learning',
     long_description=read('README.md'),
+    python_requires='>=3.8',
     install_requires=[
-        'numpy',
-        'scipy',
+        'numpy>=1.20',
+        'scipy>=1.9',
         'pandas',
         'joblib',
         'matplotlib',
@@ -34,7 +35,7 @@ setup(
                  'Intended Audience :: Education',
                  'Intended Audience :: Developers',
                  'Topic :: Scientific/Engineering :: Visualization',
-                 "Programming Language :: Python :: 3.5",
-                 "Programming Language :: Python :: 3.6",
-                 "Programming Language :: Python :: 3.7"
+                 "Programming Language :: Python :: 3.8",
+                 "Programming Language :: Python :: 3.9",
+                 "Programming Language :: Python :: 3.10"
                  ])